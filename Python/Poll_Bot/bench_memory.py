@@ -0,0 +1,110 @@
+"""
+Memory benchmark for queued polls: bytes per poll of the old nested-dict queue
+items vs the slotted Poll records.
+
+  before: {"owner_user_id": uid, "poll_data": {"question", "options": [...], "correct_answer", "explanation"}}
+  after:  Poll (__slots__, options as a tuple, short options interned)
+
+The bank is parsed once with parse_mcq_text; "text" is what the strings themselves
+take, "records" only the containers around them, so the two representations are
+compared on the same strings.
+
+Usage:
+  python bench_memory.py                        # 10k / 100k questions
+  python bench_memory.py --sizes 1000,100000 --langs en,bn,mixed
+  python bench_memory.py --save mem.json
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+
+from bench_parsers import LANGS, _parser, corpus_mcq_old, make_questions
+from poll import Poll
+
+
+def legacy_items(polls, uid=1):
+    return [
+        {"owner_user_id": uid, "poll_data": {
+            "question": p.question,
+            "options": list(p.options),
+            "correct_answer": p.correct_answer,
+            "explanation": p.explanation,
+        }}
+        for p in polls
+    ]
+
+
+def slotted_items(polls):
+    return [Poll(p.question, p.options, p.correct_answer, p.explanation) for p in polls]
+
+
+def traced(build, *args):
+    # bytes still allocated by build(*args) once it returns
+    gc.collect()
+    tracemalloc.start()
+    result = build(*args)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def run(sizes, langs):
+    results = []
+    bot = _parser()
+    for size in sizes:
+        for lang in langs:
+            text = corpus_mcq_old(make_questions(size, lang, html=False))
+            polls, parsed = traced(bot.parse_mcq_text, text)
+            n = len(polls)
+            _, after = traced(slotted_items, polls)
+            _, before = traced(legacy_items, polls)
+            text_bytes = parsed - after
+            results.append({
+                "lang": lang,
+                "size": size,
+                "polls": n,
+                "text_per_poll": text_bytes / n,
+                "before_per_poll": before / n,
+                "after_per_poll": after / n,
+                "before_total_mb": (before + text_bytes) / 1e6,
+                "after_total_mb": parsed / 1e6,
+            })
+            del polls
+    return results
+
+
+def print_table(results):
+    header = (f"{'lang':<7}{'polls':>8}{'text B':>9}{'dict B':>9}{'Poll B':>9}{'saved':>8}"
+              f"{'dict MB':>10}{'Poll MB':>10}")
+    print("bytes per queued poll (records only) and whole queue incl. text")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        saved = 1 - r["after_per_poll"] / r["before_per_poll"] if r["before_per_poll"] else 0.0
+        print(
+            f"{r['lang']:<7}{r['polls']:>8}{r['text_per_poll']:>9.0f}{r['before_per_poll']:>9.0f}"
+            f"{r['after_per_poll']:>9.0f}{saved:>7.0%} {r['before_total_mb']:>9.1f}{r['after_total_mb']:>10.1f}"
+        )
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="10000,100000", help="comma separated question counts")
+    ap.add_argument("--langs", default="en,bn", help="comma separated: " + ", ".join(LANGS))
+    ap.add_argument("--save", help="write results as JSON")
+    args = ap.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    langs = [lang for lang in args.langs.split(",") if lang]
+    results = run(sizes, langs)
+    print_table(results)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
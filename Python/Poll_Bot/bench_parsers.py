@@ -0,0 +1,213 @@
+"""
+Parser benchmark for PollBot.parse_mcq_text / parse_csv_text.
+
+Generates synthetic question banks (both MCQ text formats, CSV with and
+without a header row, Bangla / English / mixed text, HTML-laden explanations)
+and reports per-format parse time, throughput and peak memory.
+
+Usage:
+  python bench_parsers.py                          # 100 / 10k / 100k questions
+  python bench_parsers.py --sizes 100,10000 --repeat 5
+  python bench_parsers.py --save baseline.json     # keep numbers for later
+  python bench_parsers.py --compare baseline.json  # show speed-up vs a saved run
+"""
+import argparse
+import csv
+import gc
+import json
+import random
+import time
+import tracemalloc
+from io import StringIO
+
+from poll import PollBot
+
+BN_WORDS = (
+    "বাংলাদেশের রাজধানী কোনটি ঢাকা চট্টগ্রাম সিলেট খুলনা পদ্মা নদী সবচেয়ে বড় "
+    "জাতীয় ফুল শাপলা কবি লেখক স্বাধীনতা যুদ্ধ সাল কত সংবিধান অনুচ্ছেদ"
+).split()
+EN_WORDS = (
+    "what is the largest river of world nile amazon sun moon star gas oxygen "
+    "hydrogen number prime which one following true false capital city country"
+).split()
+LANGS = {"en": EN_WORDS, "bn": BN_WORDS, "mixed": EN_WORDS + BN_WORDS}
+
+HTML_BITS = ["<b>{}</b>", "<i>{}</i>", "<a href=\"https://example.com\">{}</a>", "{}<br>", "<code>{}</code>"]
+
+
+def _sentence(rng, words, lo=4, hi=14):
+    return " ".join(rng.choice(words) for _ in range(rng.randint(lo, hi)))
+
+
+def _explanation(rng, words, html):
+    parts = [_sentence(rng, words) for _ in range(rng.randint(1, 3))]
+    if html:
+        parts = [rng.choice(HTML_BITS).format(p) for p in parts]
+    return " ".join(parts)
+
+
+def make_questions(n, lang, html, seed=1):
+    rng = random.Random(seed)
+    words = LANGS[lang]
+    for _ in range(n):
+        yield (
+            _sentence(rng, words) + "?",
+            [_sentence(rng, words, 1, 4) for _ in range(4)],
+            rng.randrange(4),
+            _explanation(rng, words, html),
+        )
+
+
+def corpus_mcq_old(questions):
+    out = []
+    for i, (q, opts, ans, expl) in enumerate(questions, 1):
+        out.append(f"Question {i}:\n{q}\n")
+        out.extend(f"{'ABCD'[j]}. {o}\n" for j, o in enumerate(opts))
+        out.append(f"Correct Answer: {'ABCD'[ans]}\nExplanation: {expl}\n\n")
+    return "".join(out)
+
+
+def corpus_mcq_new(questions):
+    out = []
+    for q, opts, ans, expl in questions:
+        out.append(f"Question.\n{q}\n")
+        out.extend(f"{'ABCD'[j]}) {o}\n" for j, o in enumerate(opts))
+        out.append(f"\nAns: {'ABCD'[ans]}\nExplanation: {expl}\n\n")
+    return "".join(out)
+
+
+def _corpus_csv(questions, header):
+    buf = StringIO()
+    w = csv.writer(buf)
+    if header:
+        w.writerow(["questions", "option1", "option2", "option3", "option4", "option5", "answer", "explanation"])
+    for q, opts, ans, expl in questions:
+        w.writerow([q] + opts + ["", ans + 1, expl])
+    return buf.getvalue()
+
+
+def corpus_csv_header(questions):
+    return _corpus_csv(questions, True)
+
+
+def corpus_csv_noheader(questions):
+    return _corpus_csv(questions, False)
+
+
+FORMATS = {
+    "mcq-old": ("mcq", corpus_mcq_old),
+    "mcq-new": ("mcq", corpus_mcq_new),
+    "csv-header": ("csv", corpus_csv_header),
+    "csv-noheader": ("csv", corpus_csv_noheader),
+}
+
+
+def _parser():
+    # parsing doesn't touch the Telegram app or the queue db, so skip __init__
+    return PollBot.__new__(PollBot)
+
+
+def _parse(bot, kind, text):
+    if kind == "mcq":
+        return bot.parse_mcq_text(text)
+    return bot.parse_csv_text(text)
+
+
+def bench_one(kind, text, repeat):
+    bot = _parser()
+    best = None
+    polls = 0
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        polls = len(_parse(bot, kind, text))
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+
+    # memory in a separate run: tracemalloc slows parsing down a lot
+    gc.collect()
+    tracemalloc.start()
+    _parse(bot, kind, text)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, polls, peak
+
+
+def run(sizes, formats, langs, html, repeat):
+    results = []
+    for size in sizes:
+        for lang in langs:
+            questions = list(make_questions(size, lang, html))
+            for name in formats:
+                kind, build = FORMATS[name]
+                text = build(questions)
+                seconds, polls, peak = bench_one(kind, text, repeat)
+                results.append({
+                    "format": name,
+                    "lang": lang,
+                    "html": html,
+                    "size": size,
+                    "bytes": len(text.encode("utf-8")),
+                    "polls": polls,
+                    "seconds": seconds,
+                    "q_per_sec": size / seconds if seconds else 0.0,
+                    "mb_per_sec": len(text.encode("utf-8")) / 1e6 / seconds if seconds else 0.0,
+                    "peak_mb": peak / 1e6,
+                })
+    return results
+
+
+def _key(r):
+    return (r["format"], r["lang"], r["html"], r["size"])
+
+
+def print_table(results, baseline=None):
+    base = {_key(r): r for r in (baseline or [])}
+    header = f"{'format':<13}{'lang':<7}{'size':>8}{'polls':>8}{'time s':>10}{'q/s':>11}{'MB/s':>8}{'peak MB':>9}"
+    if base:
+        header += f"{'vs base':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        line = (
+            f"{r['format']:<13}{r['lang']:<7}{r['size']:>8}{r['polls']:>8}"
+            f"{r['seconds']:>10.3f}{r['q_per_sec']:>11.0f}{r['mb_per_sec']:>8.1f}{r['peak_mb']:>9.1f}"
+        )
+        b = base.get(_key(r))
+        if b:
+            line += f"{b['seconds'] / r['seconds']:>8.2f}x" if r["seconds"] else f"{'-':>9}"
+            if b["polls"] != r["polls"]:
+                line += f"  (polls changed: {b['polls']} -> {r['polls']})"
+        print(line)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="100,10000,100000", help="comma separated question counts")
+    ap.add_argument("--formats", default=",".join(FORMATS), help="comma separated: " + ", ".join(FORMATS))
+    ap.add_argument("--langs", default="en,bn", help="comma separated: " + ", ".join(LANGS))
+    ap.add_argument("--no-html", action="store_true", help="plain explanations instead of HTML-laden ones")
+    ap.add_argument("--repeat", type=int, default=3, help="timed runs per case (best is reported)")
+    ap.add_argument("--save", help="write results as JSON")
+    ap.add_argument("--compare", help="JSON from an earlier --save to compare against")
+    args = ap.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    formats = [f for f in args.formats.split(",") if f]
+    langs = [lang for lang in args.langs.split(",") if lang]
+
+    results = run(sizes, formats, langs, not args.no_html, args.repeat)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+Equivalence check for PollBot.parse_mcq_text against the original regex-based parser.
+
+Run it after every parser change:
+ - fuzz: generated MCQ documents (both formats, Bangla / English, multi-line
+   questions, options and explanations, lowercase and "A )" markers, "Ans.\nA",
+   empty options, blocks without an answer) must parse exactly as the baseline does
+ - known differences: inputs where the baseline's unanchored searches matched
+   inside the question text; the new output is pinned here on purpose
+
+Usage:
+  python check_parsers.py                    # 12,000 documents, seeds 0-3
+  python check_parsers.py --docs 20000 --seeds 7
+  python check_parsers.py --show 5           # print up to 5 mismatching documents
+
+Exits with status 1 on any mismatch.
+"""
+import argparse
+import logging
+import random
+import re
+import sys
+
+from poll import PollBot
+
+logger = logging.getLogger(__name__)
+
+BN_WORDS = "বাংলাদেশের রাজধানী কোনটি ঢাকা চট্টগ্রাম সিলেট খুলনা পদ্মা নদী সবচেয়ে বড় জাতীয় ফুল শাপলা কবি লেখক".split()
+EN_WORDS = (
+    "what is the largest river of world Nile Amazon sun moon star gas oxygen "
+    "hydrogen number prime which one following true false capital city country"
+).split()
+
+
+# ---------------------- Baseline ----------------------
+def baseline_parse_mcq_text(text):
+    """The original regex-based parse_mcq_text, kept verbatim as the reference."""
+
+    polls = []
+
+    # Normalize some characters & unify line endings
+    t = text.replace('\r\n', '\n').replace('\r', '\n')
+
+    # Split into blocks by headers like:
+    # "Question 1:" or "Question:" or "Question." (case-insensitive)
+    blocks = re.split(r'(?i)Question\s*\d*\s*[:.]', t)
+    # If split produced an empty leading block (text before first Question), ignore it
+    for block in blocks:
+        if not block or not block.strip():
+            continue
+
+        q_text = block.strip()
+
+        try:
+            # 1) Extract question text: everything up to the first option (A. or A) or A ))
+            q_match = re.search(r'^(.*?)(?=\n\s*A[\.\)]|\n\s*A\s*\))', q_text, re.DOTALL | re.IGNORECASE)
+            if q_match:
+                question = q_match.group(1).strip()
+            else:
+                # If not found, maybe format is "Question.\nA) ..." and question is missing
+                # Try to take the part before "A" line or first blank line
+                lines = q_text.splitlines()
+                if lines and not re.match(r'^\s*A[\.\)]', lines[0], re.IGNORECASE):
+                    question = lines[0].strip()
+                else:
+                    question = ""  # fallback
+
+            # 2) Extract options A-D with flexible separators (., ), or ) with spaces)
+            option_a = re.search(r'A[\.\)]\s*(.*?)(?=\n\s*B[\.\)]|\n\s*C[\.\)]|\n\s*D[\.\)]|$)', q_text, re.DOTALL | re.IGNORECASE)
+            option_b = re.search(r'B[\.\)]\s*(.*?)(?=\n\s*C[\.\)]|\n\s*D[\.\)]|$)', q_text, re.DOTALL | re.IGNORECASE)
+            option_c = re.search(r'C[\.\)]\s*(.*?)(?=\n\s*D[\.\)]|$)', q_text, re.DOTALL | re.IGNORECASE)
+            option_d = re.search(r'D[\.\)]\s*(.*?)(?=\n|$)', q_text, re.DOTALL | re.IGNORECASE)
+
+            if not all([option_a, option_b, option_c, option_d]):
+                # If options are on same line or different structure, try stricter pattern:
+                # Look for lines that start with 'A' optionally followed by '.' or ')'
+                lines = q_text.splitlines()
+                opts = {}
+                for line in lines:
+                    m = re.match(r'^\s*([A-D])\s*[\.\)]\s*(.*)', line, re.IGNORECASE)
+                    if m:
+                        opts[m.group(1).upper()] = m.group(2).strip()
+                if all(k in opts for k in ['A', 'B', 'C', 'D']):
+                    option_a_text = opts['A']
+                    option_b_text = opts['B']
+                    option_c_text = opts['C']
+                    option_d_text = opts['D']
+                else:
+                    # Can't parse options -> skip this block
+                    continue
+            else:
+                option_a_text = option_a.group(1).strip()
+                option_b_text = option_b.group(1).strip()
+                option_c_text = option_c.group(1).strip()
+                option_d_text = option_d.group(1).strip()
+
+            # 3) Correct answer: accept "Correct Answer:", "Correct answer:", "Ans:", "Answer:", etc.
+            corr = re.search(r'(?i)(?:Correct\s*Answer|Correct\s*answer|Answer|Ans)\s*[:.]?\s*([A-D])', q_text)
+            if not corr:
+                # try one-line variant: "Ans.\nA" or "Ans\nA"
+                corr = re.search(r'(?i)Ans\s*[:.]?\s*\n?\s*([A-D])', q_text)
+            if not corr:
+                # If still not found, skip this block (we require correct answer)
+                continue
+
+            correct_letter = corr.group(1).upper()
+            correct_index = ord(correct_letter) - ord('A')
+            if correct_index < 0 or correct_index > 3:
+                continue
+
+            # 4) Explanation: optional, everything after 'Explanation' keyword
+            expl = ""
+            expl_match = re.search(r'(?i)Explanation\s*[:.]?\s*(.*)', q_text, re.DOTALL)
+            if expl_match:
+                expl = expl_match.group(1).strip()
+
+            polls.append({
+                "question": question if question else "(No question text)",
+                "options": [
+                    option_a_text,
+                    option_b_text,
+                    option_c_text,
+                    option_d_text
+                ],
+                "correct_answer": correct_index,
+                "explanation": expl
+            })
+
+        except Exception as e:
+            # skip problematic block but continue parsing others
+            logger.error(f"parse error: {e}")
+            continue
+
+    return polls
+
+
+# ---------------------- Fuzz ----------------------
+def _text(rng, pool, max_lines=1):
+    return "\n".join(
+        " ".join(rng.choice(pool) for _ in range(rng.randint(1, 6))) for _ in range(rng.randint(1, max_lines))
+    )
+
+
+def make_block(rng, pool, messy):
+    header = rng.choice(["Question 1:", "Question:", "Question.", "question 12 :", "QUESTION."])
+    sep = rng.choice(["\n", "\n\n", " "]) if messy else "\n"
+    out = f"{header}{sep}{_text(rng, pool, 3)}\n"
+    style = rng.choice([".", ")", " )"])
+    for letter in "ABCD":
+        if messy and rng.random() < 0.1:
+            letter = letter.lower()
+        marker = rng.choice([".", ")", " )", " ."]) if messy and rng.random() < 0.1 else style
+        body = "" if messy and rng.random() < 0.05 else _text(rng, pool, 2 if messy else 1)
+        gap = rng.choice(["", " ", "  "])
+        newline = "\n" if messy and rng.random() < 0.1 else ""
+        out += f"{rng.choice(['', ' '])}{letter}{marker}{gap}{newline}{body}\n"
+        if messy and rng.random() < 0.1:
+            out += "\n"
+    if messy and rng.random() < 0.05:
+        return out  # no answer: the block must be skipped by both
+    answer = rng.choice(["Correct Answer: ", "Ans: ", "Answer: ", "Ans.\n", "ans:", "Correct answer :"])
+    out += ("\n" if rng.random() < 0.5 else "") + answer + rng.choice("ABCDabcd") + "\n"
+    if rng.random() < 0.7:
+        out += rng.choice(["Explanation: ", "Explanation.", "explanation ", "Explanation:\n"]) + _text(rng, pool, 3) + "\n"
+    return out
+
+
+def make_document(rng, i):
+    pool = BN_WORDS if i % 3 == 0 else BN_WORDS + EN_WORDS
+    blocks = "".join(make_block(rng, pool, i % 2 == 0) for _ in range(rng.randint(1, 5)))
+    return rng.choice(["", "junk before\n"]) + blocks
+
+
+def as_dicts(polls):
+    return [
+        {"question": p.question, "options": list(p.options), "correct_answer": p.correct_answer,
+         "explanation": p.explanation}
+        for p in polls
+    ]
+
+
+# ---------------------- Known differences ----------------------
+def _poll(question, options, answer, explanation=""):
+    return {"question": question, "options": options, "correct_answer": answer, "explanation": explanation}
+
+
+OPTS = ["one", "two", "three", "four"]
+BIO = ["protein", "sugar", "nucleic acid", "lipid"]
+
+# (name, text, new output); the baseline gives something else for each of these
+KNOWN_DIFFERENCES = [
+    (
+        "'DNA.' at the end of the question is not option D",
+        "Question 1:\nWhich molecule is called DNA.\nA. protein\nB. sugar\nC. nucleic acid\nD. lipid\n"
+        "Correct Answer: C\n",
+        [_poll("Which molecule is called DNA.", BIO, 2)],
+    ),
+    (
+        "'DNA.' at the start of the question is not option D",
+        "Question 1:\nDNA. stands for what\nA. protein\nB. sugar\nC. nucleic acid\nD. lipid\nCorrect Answer: C\n",
+        [_poll("DNA. stands for what", BIO, 2)],
+    ),
+    (
+        "'correct answer b' in the question is not the answer",
+        "Question 1:\nPick the correct answer b for this one\nA. one\nB. two\nC. three\nD. four\nAns: D\n",
+        [_poll("Pick the correct answer b for this one", OPTS, 3)],
+    ),
+    (
+        "'correct answer' + the 'A.' line is not the answer",
+        "Question 1:\nWhich is the correct answer\nA. one\nB. two\nC. three\nD. four\nAns: D\n",
+        [_poll("Which is the correct answer", OPTS, 3)],
+    ),
+    (
+        "'explanation' in the question doesn't start the explanation",
+        "Question 1:\nWhat explanation fits best?\nA. one\nB. two\nC. three\nD. four\nAns: A\n"
+        "Explanation: because\n",
+        [_poll("What explanation fits best?", OPTS, 0, "because")],
+    ),
+]
+
+
+def check_known(parser):
+    failures = 0
+    for name, text, expected in KNOWN_DIFFERENCES:
+        new = as_dicts(parser.parse_mcq_text(text))
+        old = baseline_parse_mcq_text(text)
+        if new != expected:
+            failures += 1
+            print(f"FAIL known difference: {name}\n  expected {expected}\n  got      {new}")
+        elif old == new:
+            # the baseline agrees now, so this case no longer documents a difference
+            print(f"note: baseline gives the same output for: {name}")
+    return failures
+
+
+def fuzz(parser, docs, seeds, show):
+    mismatches = polls = 0
+    per_seed = max(1, docs // len(seeds))
+    for seed in seeds:
+        rng = random.Random(seed)
+        for i in range(per_seed):
+            text = make_document(rng, i)
+            old = baseline_parse_mcq_text(text)
+            new = as_dicts(parser.parse_mcq_text(text))
+            polls += len(old)
+            if old != new:
+                mismatches += 1
+                if mismatches <= show:
+                    print(f"MISMATCH (seed {seed}, doc {i}):\n{text!r}\n  baseline {old}\n  new      {new}\n")
+    return per_seed * len(seeds), polls, mismatches
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--docs", type=int, default=12000, help="generated documents in total")
+    ap.add_argument("--seeds", default="0,1,2,3", help="comma separated RNG seeds")
+    ap.add_argument("--show", type=int, default=3, help="mismatching documents to print")
+    args = ap.parse_args()
+
+    # parsing doesn't touch the Telegram app or the queue db, so skip __init__
+    parser = PollBot.__new__(PollBot)
+    failures = check_known(parser)
+    print(f"known differences: {len(KNOWN_DIFFERENCES) - failures}/{len(KNOWN_DIFFERENCES)} as pinned")
+
+    seeds = [int(s) for s in args.seeds.split(",") if s]
+    docs, polls, mismatches = fuzz(parser, args.docs, seeds, args.show)
+    print(f"fuzz: {docs} documents, {polls} polls, {mismatches} mismatches")
+    sys.exit(1 if failures or mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
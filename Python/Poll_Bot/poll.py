@@ -1,11 +1,19 @@
 import re
+import sys
 import asyncio
 import time
 import json
 import os
 import logging
+import sqlite3
+import tempfile
+import csv
+import hashlib
+import argparse
+import heapq
 from collections import deque
-from io import BytesIO
+from datetime import datetime, timedelta, timezone
+from io import BytesIO, StringIO
 from telegram import Update
 from telegram.constants import ParseMode
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
@@ -20,54 +28,910 @@ logging.basicConfig(level=logging.ERROR, format="%(message)s")
 logger = logging.getLogger(__name__)
 # -----------------------------------------------------
 
-DELAY_BETWEEN_POLLS = 3
-POLLS_PER_BATCH = 20
-BREAK_BETWEEN_BATCHES = 5
 RETRY_ATTEMPTS = 3
 DATA_FILE = "sot_bot_user_data.json"
+SAVE_INTERVAL = 5          # seconds between write-behind flushes of DATA_FILE
+QUEUE_DB_FILE = os.path.splitext(DATA_FILE)[0] + "_queue.db"
+
+# poll status updates are written to the queue db in batches
+STATUS_FLUSH_EVERY = 10
+STATUS_FLUSH_SECONDS = 2
+# channel workers read their job's polls back from the queue db in pages
+JOB_PAGE_SIZE = 100
+# streamed file imports are written to the queue db in batches of rows
+IMPORT_BATCH_SIZE = 200
+# dedup: remember this many poll hashes per channel, oldest are evicted first
+DEDUP_MAX_PER_CHANNEL = 50000
+
+# fair scheduling of jobs sharing a channel (deficit round robin):
+# every turn a job may send FAIR_QUANTUM * weight polls; weights are set with /setweight
+FAIR_QUANTUM = 1
+DEFAULT_USER_WEIGHT = 1
+# jobs of one user interleaved at the same time on a channel; the rest wait their turn
+USER_MAX_IN_FLIGHT = 2
+
+# long pastes arrive as several <=4096 char messages: a message at least this long
+# starts an assembly, and the pieces are joined until the user is quiet for ASSEMBLE_WINDOW seconds
+ASSEMBLE_MIN_LEN = 3000
+ASSEMBLE_WINDOW = 2.0
+
+# scheduled publishing (/schedule): times typed by users are read in SCHEDULE_TZ (Asia/Dhaka)
+SCHEDULE_TZ = timezone(timedelta(hours=6))
+# the timer heap re-checks the wall clock at least this often (clock jumps, suspend)
+TIMER_MAX_SLEEP = 60
+DURATION = re.compile(r'(\d+)([smhd])$', re.IGNORECASE)
+DURATION_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# one progress message per upload, edited in place at most once per PROGRESS_EDIT_INTERVAL seconds
+PROGRESS_EDIT_INTERVAL = 5
+
+# full texts of truncated polls are collected per job and uploaded as one .txt every
+# FALLBACK_BATCH_SIZE polls (and at the end of the job), in the background
+FALLBACK_BATCH_SIZE = 20
+FALLBACK_SHUTDOWN_WAIT = 10  # seconds to let pending uploads finish on shutdown
+WORKER_SHUTDOWN_WAIT = 10    # seconds for channel workers to finish the poll in flight on shutdown
+
+# poll options up to this many characters are interned (see Poll): banks repeat them a lot
+INTERN_MAX_LEN = 40
+
+# Telegram quiz limits (sendPoll), in UTF-16 code units
+POLL_QUESTION_LIMIT = 300
+POLL_OPTION_LIMIT = 100
+POLL_EXPLANATION_LIMIT = 200
+POLL_EXPLANATION_LINE_FEEDS = 2
+POLL_MIN_OPTIONS = 2
+POLL_MAX_OPTIONS = 10
+# at most this many rejected polls are listed in the queue-time summary
+REJECT_REPORT_LINES = 20
+
+# metrics: /stats is only answered for these Telegram user ids; the Prometheus
+# text file is rewritten every METRICS_INTERVAL seconds for node-exporter's textfile collector
+ADMIN_USER_IDS = set()
+METRICS_FILE = "sot_bot_metrics.prom"
+METRICS_INTERVAL = 15
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+# precompiled patterns for parse_mcq_text
+MCQ_BLOCK_SPLIT = re.compile(r'(?i)Question\s*\d*\s*[:.]')
+MCQ_OPTION_LINE = re.compile(r'\s*([A-D])(\s*)([\.\)])', re.IGNORECASE)
+MCQ_OPTION_STOPS = {'A': {'B', 'C', 'D'}, 'B': {'C', 'D'}, 'C': {'D'}}
+MCQ_ANSWER = re.compile(r'(?:Correct\s*Answer|Answer|Ans)\s*[:.]?\s*([A-D])', re.IGNORECASE)
+MCQ_EXPLANATION = re.compile(r'Explanation\s*[:.]?\s*(.*)', re.IGNORECASE | re.DOTALL)
+
+# rate limiter (messages per second). Telegram allows ~30 msg/s overall and
+# about 1 msg/s into a single chat; we start there and learn from RetryAfter.
+GLOBAL_RATE = 30
+GLOBAL_BURST = 30
+CHAT_RATE = 1.0
+CHAT_BURST = 3
+MIN_RATE = 1 / 60          # never back off below one poll per minute
+RATE_STEP = 0.02           # additive ramp-up after every successful send
+RETRY_BACKOFF = 0.5        # multiplicative back-off of a chat's rate on RetryAfter
+GLOBAL_RETRY_BACKOFF = 0.9
+
+# webhook mode (python poll.py --webhook): Telegram, or a reverse proxy, POSTs updates to us
+WEBHOOK_LISTEN = "0.0.0.0"
+WEBHOOK_PORT = 8443
+WEBHOOK_PATH = "/telegram"
+WEBHOOK_SECRET = ""        # checked against X-Telegram-Bot-Api-Secret-Token when set
+WEBHOOK_URL = ""           # public https base URL; setWebhook is called with it on startup
+
+
+# ---------------------- Rate Limiting ----------------------
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        """Seconds until one token is available (0 if available now)."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def drain(self, now):
+        self._refill(now)
+        self.tokens = min(self.tokens, 0)
+
+
+class RateLimiter:
+    """
+    Per-chat token buckets plus one global bucket (AIMD):
+     - acquire(chat) waits until both buckets have a token
+     - on_success(chat) ramps the rates back up a little
+     - on_retry_after(chat, secs) backs the rates off and blocks the chat for `secs`
+    """
+
+    def __init__(self, global_rate=GLOBAL_RATE, chat_rate=CHAT_RATE):
+        self.max_global_rate = global_rate
+        self.max_chat_rate = chat_rate
+        self.global_bucket = TokenBucket(global_rate, GLOBAL_BURST)
+        self.chat_buckets = {}
+        self.blocked_until = {}
+
+    def _bucket(self, chat):
+        b = self.chat_buckets.get(chat)
+        if b is None:
+            b = TokenBucket(self.max_chat_rate, CHAT_BURST)
+            self.chat_buckets[chat] = b
+        return b
+
+    async def acquire(self, chat):
+        bucket = self._bucket(chat)
+        while True:
+            now = time.monotonic()
+            wait = max(
+                self.blocked_until.get(chat, 0) - now,
+                bucket.wait_time(now),
+                self.global_bucket.wait_time(now),
+            )
+            if wait <= 0:
+                bucket.take(now)
+                self.global_bucket.take(now)
+                return
+            await asyncio.sleep(wait)
+
+    def on_success(self, chat):
+        bucket = self._bucket(chat)
+        bucket.rate = min(self.max_chat_rate, bucket.rate + RATE_STEP)
+        g = self.global_bucket
+        g.rate = min(self.max_global_rate, g.rate + RATE_STEP)
+
+    def on_retry_after(self, chat, retry_after):
+        now = time.monotonic()
+        bucket = self._bucket(chat)
+        bucket.rate = max(MIN_RATE, bucket.rate * RETRY_BACKOFF)
+        bucket.drain(now)
+        g = self.global_bucket
+        g.rate = max(MIN_RATE, g.rate * GLOBAL_RETRY_BACKOFF)
+        self.blocked_until[chat] = max(self.blocked_until.get(chat, 0), now + retry_after)
+
+    def chat_rate(self, chat):
+        return min(self._bucket(chat).rate, self.global_bucket.rate)
+
+    def estimate_seconds(self, chat, count):
+        """Rough time to send `count` messages to `chat` at the current learned rate."""
+        now = time.monotonic()
+        bucket = self._bucket(chat)
+        bucket._refill(now)
+        blocked = max(0, self.blocked_until.get(chat, 0) - now)
+        pending = max(0, count - int(bucket.tokens))
+        return blocked + pending / self.chat_rate(chat)
+
+
+# ---------------------- Message Assembly ----------------------
+class MessageAssembler:
+    """
+    Joins the pieces of one long MCQ paste. Every complete "Question ..." block is
+    parsed as soon as the next header arrives; only the trailing block, which the
+    next piece may still continue, is kept as text and parsed again with it.
+    """
+
+    def __init__(self, parse):
+        self.parse = parse
+        self.polls = []
+        self.tail = ""
+        self.parts = 0
+        self.deadline = 0.0
+        self.update = None
+
+    def feed(self, text):
+        self.parts += 1
+        self.deadline = time.monotonic() + ASSEMBLE_WINDOW
+        # clients split long pastes at line breaks, so the pieces are joined by one
+        t = self.tail + "\n" + text if self.tail else text
+        last = None
+        for last in MCQ_BLOCK_SPLIT.finditer(t):
+            pass
+        if last is None or not last.start():
+            self.tail = t
+            return
+        self.polls.extend(self.parse(t[:last.start()]))
+        self.tail = t[last.start():]
+
+    def finish(self):
+        if self.tail:
+            self.polls.extend(self.parse(self.tail))
+            self.tail = ""
+        return self.polls
+
+
+# ---------------------- Timers & Schedules ----------------------
+class TimerHeap:
+    """
+    All of the bot's timers in one task: a heap of (due, n, callback). It sleeps
+    until the earliest entry is due, or until an earlier one is pushed, and calls
+    it. Due times are wall-clock (time.time()), so they mean the same after a restart.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.n = 0
+        self.changed = asyncio.Event()
+
+    def push(self, due, callback):
+        heapq.heappush(self.heap, (due, self.n, callback))
+        self.n += 1
+        if self.heap[0][1] == self.n - 1:
+            # new earliest entry: wake run() to sleep for less
+            self.changed.set()
+
+    async def run(self):
+        while True:
+            now = time.time()
+            while self.heap and self.heap[0][0] <= now:
+                _, _, callback = heapq.heappop(self.heap)
+                try:
+                    callback()
+                except Exception as e:
+                    logger.error(f"timer error: {e}")
+            self.changed.clear()
+            timeout = min(self.heap[0][0] - now, TIMER_MAX_SLEEP) if self.heap else None
+            try:
+                await asyncio.wait_for(self.changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+def parse_duration(s):
+    m = DURATION.match(s.strip())
+    if not m:
+        raise ValueError(f"bad duration: {s}")
+    return int(m.group(1)) * DURATION_SECONDS[m.group(2).lower()]
+
+
+def parse_schedule(args, now=None):
+    """
+    /schedule arguments -> {"start_at": epoch, "batch": polls per release, "spacing": seconds}.
+      /schedule 18:30                 today (or tomorrow) 18:30, everything at once
+      /schedule 2026-10-20 09:00 10/1h
+      /schedule +30m 5/15m            in 30 minutes, then 5 polls every 15 minutes
+    batch 0 means all polls at start_at.
+    """
+    now = time.time() if now is None else now
+    args = list(args)
+    if not args:
+        raise ValueError("missing start time")
+    when = args.pop(0)
+    if when.startswith("+"):
+        start_at = now + parse_duration(when[1:])
+    elif when.lower() == "now":
+        start_at = now
+    else:
+        if args and ":" in args[0]:
+            when += " " + args.pop(0)
+        local_now = datetime.fromtimestamp(now, SCHEDULE_TZ)
+        try:
+            dt = datetime.strptime(when, "%Y-%m-%d %H:%M").replace(tzinfo=SCHEDULE_TZ)
+        except ValueError:
+            t = datetime.strptime(when, "%H:%M")
+            dt = local_now.replace(hour=t.hour, minute=t.minute, second=0, microsecond=0)
+            if dt <= local_now:
+                dt += timedelta(days=1)
+        start_at = dt.timestamp()
+
+    batch, spacing = 0, 0
+    if args:
+        count, _, every = args.pop(0).partition("/")
+        batch, spacing = int(count), parse_duration(every)
+        if batch < 1 or spacing < 1:
+            raise ValueError("bad spread")
+    if args:
+        raise ValueError(f"unexpected: {' '.join(args)}")
+    return {"start_at": start_at, "batch": batch, "spacing": spacing}
+
+
+def format_when(ts):
+    return datetime.fromtimestamp(ts, SCHEDULE_TZ).strftime("%d %b %H:%M")
+
+
+def format_duration(secs):
+    for unit in ("d", "h", "m"):
+        if secs % DURATION_SECONDS[unit] == 0:
+            return f"{secs // DURATION_SECONDS[unit]}{unit}"
+    return f"{secs}s"
+
+
+def poll_due(schedule, seq):
+    # release time of the seq-th poll of a scheduled job (0 = not scheduled)
+    if not schedule:
+        return 0
+    if not schedule["batch"]:
+        return schedule["start_at"]
+    return schedule["start_at"] + (seq // schedule["batch"]) * schedule["spacing"]
+
+
+def describe_schedule(schedule, total=None):
+    text = f"Scheduled: from {format_when(schedule['start_at'])}"
+    if schedule["batch"]:
+        text += f", {schedule['batch']} polls every {format_duration(schedule['spacing'])}"
+        if total:
+            text += f" (last batch {format_when(poll_due(schedule, total - 1))})"
+    return text
+
+
+# ---------------------- Records ----------------------
+class Poll:
+    """
+    One quiz poll. Slots instead of a dict (and a list of options) per poll, since
+    big banks sit in memory as lists of these while they are parsed, joined and
+    queued; short options ("All of the above", "True") are interned and shared.
+    `hash` is set by prepare_polls, `full_text` only for polls truncated up front.
+    """
+    __slots__ = ("question", "options", "correct_answer", "explanation", "hash", "full_text")
+
+    def __init__(self, question, options, correct_answer, explanation="", hash=None, full_text=None):
+        self.question = question
+        self.options = tuple(sys.intern(o) if len(o) <= INTERN_MAX_LEN else o for o in options)
+        self.correct_answer = correct_answer
+        self.explanation = explanation
+        self.hash = hash
+        self.full_text = full_text
+
+    def to_dict(self):
+        # queue db format (polls.data); unset fields are left out
+        d = {"question": self.question, "options": self.options,
+             "correct_answer": self.correct_answer, "explanation": self.explanation}
+        if self.hash:
+            d["hash"] = self.hash
+        if self.full_text:
+            d["full_text"] = self.full_text
+        return d
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["question"], d["options"], d.get("correct_answer", 0), d.get("explanation", ""),
+                   d.get("hash"), d.get("full_text"))
+
+    def __repr__(self):
+        return f"Poll({self.question[:40]!r}, {len(self.options)} options)"
+
+
+class Job:
+    """
+    A job handed to a channel worker: the polls of one upload for one channel.
+    The polls themselves live in the queue db and are read a page at a time into
+    `buffer`; while `feeding` is True a streamed import is still appending to it.
+    A scheduled job's polls are held back until poll_due() of their seq.
+    `paused` / `cancelled` are checked before every poll (see PollBot._job_ready).
+    """
+    __slots__ = (
+        "job_id", "owner_user_id", "target", "total", "sent", "failed", "resumed", "feeding",
+        "buffer", "last_seq", "started_at", "done", "group", "schedule", "timer_at",
+        "paused", "cancelled", "fallback", "deficit",
+    )
+
+    def __init__(self, job_id, owner_user_id, target, total, group,
+                 resumed=False, feeding=False, schedule=None, paused=False):
+        self.job_id = job_id
+        self.owner_user_id = owner_user_id
+        self.target = target
+        self.total = total
+        self.sent = 0
+        self.failed = 0
+        self.resumed = resumed
+        self.feeding = feeding
+        self.buffer = deque()       # (seq, Poll) read from the queue db
+        self.last_seq = -1
+        self.started_at = None
+        self.done = False
+        self.group = group
+        self.schedule = schedule
+        self.timer_at = None
+        self.paused = paused
+        self.cancelled = False
+        self.fallback = []          # (poll number, full text) of truncated polls not uploaded yet
+        self.deficit = 0            # FairScheduler credits
+
+    def __repr__(self):
+        return f"Job(#{self.job_id} {self.target}: {self.sent}/{self.total})"
+
+
+# ---------------------- Fair Scheduling ----------------------
+class FairScheduler:
+    """
+    Deficit round robin over the jobs of one channel, so a small job isn't stuck
+    behind someone's 5,000 polls. On its turn a job earns FAIR_QUANTUM * weight
+    credits and sends one poll per credit; jobs with nothing to send give up
+    their turn. A user has at most USER_MAX_IN_FLIGHT jobs in the rotation,
+    the others wait in order.
+    """
+
+    def __init__(self, weight_of):
+        self.weight_of = weight_of
+        self.active = deque()
+        self.held = deque()
+        self.in_flight = {}
+        self.finished = []
+        self.changed = asyncio.Event()
+
+    def add(self, job):
+        uid = job.owner_user_id
+        if self.in_flight.get(uid, 0) < USER_MAX_IN_FLIGHT:
+            self._activate(job)
+        else:
+            self.held.append(job)
+        self.changed.set()
+
+    def _activate(self, job):
+        uid = job.owner_user_id
+        job.deficit = 0
+        self.active.append(job)
+        self.in_flight[uid] = self.in_flight.get(uid, 0) + 1
+
+    def remove(self, job):
+        if job in self.held:
+            self.held.remove(job)
+            return
+        self.active.remove(job)
+        uid = job.owner_user_id
+        self.in_flight[uid] -= 1
+        if not self.in_flight[uid]:
+            del self.in_flight[uid]
+        for waiting in self.held:
+            if waiting.owner_user_id == uid:
+                self.held.remove(waiting)
+                self._activate(waiting)
+                break
+
+    def cancel(self, job):
+        # held jobs never reach pick(), so retire them here; active ones leave via ready()
+        if job in self.held:
+            self.held.remove(job)
+            self.finished.append(job)
+        self.changed.set()
+
+    def qsize(self):
+        return len(self.active) + len(self.held)
+
+    def pick(self, ready):
+        """
+        Next job allowed to send one poll, or None if none has anything to send.
+        `ready(job)` says whether the job has a poll available; jobs it marks
+        "done" leave the rotation and are collected in self.finished.
+        """
+        idle = 0
+        while self.active and idle < len(self.active):
+            job = self.active[0]
+            if not ready(job):
+                if job.done:
+                    self.remove(job)
+                    self.finished.append(job)
+                    continue
+                job.deficit = 0
+                self.active.rotate(-1)
+                idle += 1
+                continue
+            idle = 0
+            if job.deficit < 1:
+                # a new turn for this job
+                job.deficit += FAIR_QUANTUM * self.weight_of(job.owner_user_id)
+                if job.deficit < 1:
+                    self.active.rotate(-1)
+                    continue
+            job.deficit -= 1
+            if job.deficit < 1:
+                self.active.rotate(-1)
+            return job
+        return None
+
+
+# ---------------------- Durable Queue ----------------------
+class PollStore:
+    """
+    SQLite (WAL) copy of every job handed to a channel worker, so unfinished
+    jobs survive a crash or redeploy. Each poll has a status: pending/sent/failed.
+    A job is inserted in one transaction; status updates are buffered and
+    written every STATUS_FLUSH_EVERY updates / STATUS_FLUSH_SECONDS seconds.
+    """
+
+    def __init__(self, path=QUEUE_DB_FILE):
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                owner_user_id INTEGER NOT NULL,
+                target TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS polls (
+                job_id INTEGER NOT NULL,
+                seq INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                PRIMARY KEY (job_id, seq)
+            );
+            CREATE TABLE IF NOT EXISTS poll_hashes (
+                target TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                added_at REAL NOT NULL,
+                PRIMARY KEY (target, hash)
+            );
+            CREATE INDEX IF NOT EXISTS poll_hashes_age ON poll_hashes (target, added_at);
+        """)
+        # jobs.schedule (json, see parse_schedule) and jobs.paused came later; add them to older dbs
+        columns = [r[1] for r in self.db.execute("PRAGMA table_info(jobs)")]
+        for name, decl in (("schedule", "TEXT"), ("paused", "INTEGER NOT NULL DEFAULT 0")):
+            if name not in columns:
+                self.db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {decl}")
+        self.pending_status = []
+        self.last_flush = time.monotonic()
+
+    def add_job(self, uid, target, polls=(), schedule=None):
+        with self.db:
+            cur = self.db.execute(
+                "INSERT INTO jobs (owner_user_id, target, created_at, schedule) VALUES (?, ?, ?, ?)",
+                (uid, json.dumps(target), time.time(), json.dumps(schedule) if schedule else None)
+            )
+            job_id = cur.lastrowid
+            self._insert_polls(job_id, 0, polls)
+        return job_id
+
+    def add_polls(self, job_id, start_seq, polls):
+        """Append more polls to an existing job (streamed imports)."""
+        with self.db:
+            self._insert_polls(job_id, start_seq, polls)
+
+    def _insert_polls(self, job_id, start_seq, polls):
+        self.db.executemany(
+            "INSERT INTO polls (job_id, seq, data) VALUES (?, ?, ?)",
+            ((job_id, start_seq + i, json.dumps(p.to_dict(), ensure_ascii=False)) for i, p in enumerate(polls))
+        )
+
+    def pending_polls(self, job_id, after_seq, limit=JOB_PAGE_SIZE):
+        rows = self.db.execute(
+            "SELECT seq, data FROM polls WHERE job_id = ? AND seq > ? AND status = 'pending' ORDER BY seq LIMIT ?",
+            (job_id, after_seq, limit)
+        ).fetchall()
+        return [(seq, Poll.from_dict(json.loads(data))) for seq, data in rows]
+
+    def set_status(self, job_id, seq, status):
+        self.pending_status.append((status, job_id, seq))
+        if (len(self.pending_status) >= STATUS_FLUSH_EVERY
+                or time.monotonic() - self.last_flush >= STATUS_FLUSH_SECONDS):
+            self.flush()
+
+    def flush(self):
+        if self.pending_status:
+            with self.db:
+                self.db.executemany("UPDATE polls SET status = ? WHERE job_id = ? AND seq = ?", self.pending_status)
+            self.pending_status = []
+        self.last_flush = time.monotonic()
+
+    # --- dedup index: hashes of polls already queued/sent per channel ---
+    def claim_hash(self, target, h):
+        """
+        True if `h` is new for this channel (and remember it), False for a duplicate.
+        Not committed here; the next job/status write or evict_hashes() commits it.
+        """
+        cur = self.db.execute(
+            "INSERT OR IGNORE INTO poll_hashes (target, hash, added_at) VALUES (?, ?, ?)",
+            (json.dumps(target), h, time.time())
+        )
+        return cur.rowcount == 1
+
+    def forget_hash(self, target, h):
+        # a poll that failed to send may be queued again later
+        with self.db:
+            self.db.execute("DELETE FROM poll_hashes WHERE target = ? AND hash = ?", (json.dumps(target), h))
+
+    def evict_hashes(self, target, keep=DEDUP_MAX_PER_CHANNEL):
+        key = json.dumps(target)
+        with self.db:
+            (n,) = self.db.execute("SELECT COUNT(*) FROM poll_hashes WHERE target = ?", (key,)).fetchone()
+            if n > keep:
+                self.db.execute(
+                    "DELETE FROM poll_hashes WHERE rowid IN "
+                    "(SELECT rowid FROM poll_hashes WHERE target = ? ORDER BY added_at LIMIT ?)",
+                    (key, n - keep)
+                )
+
+    def set_paused(self, job_id, paused):
+        with self.db:
+            self.db.execute("UPDATE jobs SET paused = ? WHERE id = ?", (int(paused), job_id))
+
+    def release_pending_hashes(self, job_id, target):
+        # a cancelled job's unsent polls may be queued again later
+        self.flush()
+        with self.db:
+            self.db.execute(
+                "DELETE FROM poll_hashes WHERE target = ? AND hash IN "
+                "(SELECT json_extract(data, '$.hash') FROM polls WHERE job_id = ? AND status = 'pending')",
+                (json.dumps(target), job_id)
+            )
+
+    def pending_count(self):
+        (n,) = self.db.execute("SELECT COUNT(*) FROM polls WHERE status = 'pending'").fetchone()
+        return n
+
+    def finish_job(self, job_id):
+        self.flush()
+        with self.db:
+            self.db.execute("DELETE FROM polls WHERE job_id = ?", (job_id,))
+            self.db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def unfinished_jobs(self):
+        """Jobs with pending polls, oldest first: [(job_id, uid, target, pending_count, schedule, paused)]"""
+        jobs = []
+        rows = self.db.execute("SELECT id, owner_user_id, target, schedule, paused FROM jobs ORDER BY id").fetchall()
+        for job_id, uid, target, schedule, paused in rows:
+            (pending,) = self.db.execute(
+                "SELECT COUNT(*) FROM polls WHERE job_id = ? AND status = 'pending'", (job_id,)
+            ).fetchone()
+            if not pending:
+                self.finish_job(job_id)
+                continue
+            jobs.append((job_id, uid, json.loads(target), pending, json.loads(schedule) if schedule else None,
+                         bool(paused)))
+        return jobs
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+
+def atomic_write_text(path, text):
+    # write to a temp file in the same directory, then rename over the old file,
+    # so a crash mid-write never leaves a truncated file behind
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def atomic_write_json(path, data):
+    atomic_write_text(path, json.dumps(data, ensure_ascii=False))
+
+
+# ---------------------- Metrics ----------------------
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, le in enumerate(self.buckets):
+            if value <= le:
+                self.counts[i] += 1
+                break
+
+    def quantile(self, q):
+        """Upper bucket bound holding the q-th quantile (good enough for /stats)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for le, c in zip(self.buckets, self.counts):
+            seen += c
+            if seen >= rank:
+                return le
+        return float("inf")
+
+
+class Metrics:
+    """
+    In-process counters and latency histograms for the sending pipeline,
+    rendered as Prometheus text format (names get a "pollbot_" prefix).
+    """
+
+    HELP = {
+        "polls_sent_total": ("counter", "Polls delivered to a channel"),
+        "polls_failed_total": ("counter", "Polls that could not be delivered, by reason"),
+        "polls_rejected_total": ("counter", "Polls rejected by the pre-flight check"),
+        "polls_truncated_total": ("counter", "Polls truncated up front (full text sent as .txt)"),
+        "polls_duplicate_total": ("counter", "Polls skipped because the channel already got them"),
+        "fallback_docs_total": ("counter", "original_polls.txt documents uploaded (one per batch of truncated polls)"),
+        "retry_after_total": ("counter", "RetryAfter (429) responses from Telegram"),
+        "retry_after_wait_seconds_total": ("counter", "Seconds Telegram asked us to wait"),
+        "jobs_started_total": ("counter", "Jobs handed to a channel worker"),
+        "jobs_finished_total": ("counter", "Jobs fully processed by a channel worker"),
+        "progress_edits_total": ("counter", "Edits of users' progress messages"),
+        "jobs_cancelled_total": ("counter", "Jobs stopped early with /cancel"),
+        "send_poll_seconds": ("histogram", "send_single_poll duration incl. rate-limit waits"),
+        "telegram_api_seconds": ("histogram", "Latency of a single sendPoll API call"),
+        "process_queue_seconds": ("histogram", "process_queue duration"),
+        "job_seconds": ("histogram", "Time from a job's first poll to its completion"),
+        "queue_pending_polls": ("gauge", "Polls waiting in the queue db"),
+        "queued_jobs": ("gauge", "Jobs scheduled on channel workers (interleaved or waiting)"),
+        "channel_workers": ("gauge", "Running channel workers"),
+    }
+
+    def __init__(self):
+        self.started = time.time()
+        self.counters = {}      # name -> {label value or None: count}
+        self.histograms = {}    # name -> Histogram
+
+    def inc(self, name, value=1, reason=None):
+        series = self.counters.setdefault(name, {})
+        series[reason] = series.get(reason, 0) + value
+
+    def observe(self, name, seconds):
+        h = self.histograms.get(name)
+        if h is None:
+            h = self.histograms[name] = Histogram()
+        h.observe(seconds)
+
+    def total(self, name):
+        return sum(self.counters.get(name, {}).values())
+
+    def render(self, gauges):
+        out = []
+
+        def head(name):
+            kind, text = self.HELP.get(name, ("untyped", name))
+            out.append(f"# HELP pollbot_{name} {text}")
+            out.append(f"# TYPE pollbot_{name} {kind}")
+
+        for name, series in sorted(self.counters.items()):
+            head(name)
+            for reason, value in sorted(series.items(), key=lambda kv: str(kv[0])):
+                label = f'{{reason="{reason}"}}' if reason is not None else ""
+                out.append(f"pollbot_{name}{label} {value:g}")
+        for name, h in sorted(self.histograms.items()):
+            head(name)
+            cumulative = 0
+            for le, c in zip(h.buckets, h.counts):
+                cumulative += c
+                out.append(f'pollbot_{name}_bucket{{le="{le:g}"}} {cumulative}')
+            out.append(f'pollbot_{name}_bucket{{le="+Inf"}} {h.count}')
+            out.append(f"pollbot_{name}_sum {h.sum:.6f}")
+            out.append(f"pollbot_{name}_count {h.count}")
+        for name, value in sorted(gauges.items()):
+            head(name)
+            out.append(f"pollbot_{name} {value:g}")
+        return "\n".join(out) + "\n"
+
+
+def poll_hash(poll):
+    # normalized question + options + answer, so re-pasted (re-spaced / re-cased) polls match
+    def norm(t):
+        return " ".join(str(t or "").split()).casefold()
+    key = "\x1f".join([norm(poll.question)] + [norm(o) for o in poll.options] + [str(poll.correct_answer)])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def tg_len(s):
+    # Telegram measures text in UTF-16 code units (emoji count as 2)
+    return len(s.encode("utf-16-le")) // 2
+
+
+def tg_truncate(s, limit, marker):
+    if tg_len(s) <= limit:
+        return s
+    room = limit - tg_len(marker)
+    cut = s.encode("utf-16-le")[:room * 2].decode("utf-16-le", errors="ignore")
+    return cut.rstrip() + marker
+
+
+def retry_after_seconds(e):
+    # newer python-telegram-bot versions may report retry_after as a timedelta
+    ra = e.retry_after
+    return ra.total_seconds() if hasattr(ra, "total_seconds") else float(ra)
 
-# safe limits for fallback truncation (you can tune)
-FALLBACK_QUESTION_LIMIT = 1000
-FALLBACK_OPTION_LIMIT = 300
-FALLBACK_EXPLANATION_LIMIT = 2000
 
 class PollBot:
-    def __init__(self, token):
+    def __init__(self, token, base_url=None, base_file_url=None):
         self.token = token
-        self.app = Application.builder().token(token).build()
-
-        self.poll_queue = deque()
-        self.is_processing = False
-        self.current_user_id = None
-        self.last_poll_time = 0
+        builder = (
+            Application.builder().token(token)
+            .post_init(self._on_startup)
+            .post_stop(self._on_stop)
+            .post_shutdown(self._on_shutdown)
+        )
+        if base_url:
+            # another Bot API server, e.g. the local fake one in ../bot_loadtest
+            builder.base_url(base_url).base_file_url(base_file_url or base_url.replace("/bot", "/file/bot"))
+        self.app = builder.build()
+
+        # parsed polls per user until process_queue turns them into a job: uid -> deque
+        self.user_queues = {}
+        # split long pastes being joined: uid -> MessageAssembler
+        self.assemblers = {}
+        self.assembler_tasks = {}
+        # live jobs (see _new_job): job_id -> job, uid -> {job_id: job} in start order
+        self.jobs = {}
+        self.user_jobs = {}
+        self.rate_limiter = RateLimiter()
+        # background original_polls.txt uploads (see _flush_fallback)
+        self.fallback_tasks = set()
+        # running file imports (see handle_document)
+        self.import_tasks = set()
+        self.metrics = Metrics()
+        self._metrics_writer = None
+
+        # one long-lived sender per target channel: chat -> FairScheduler of jobs / worker task
+        self.channel_queues = {}
+        self.channel_workers = {}
+        # set in _on_stop; workers finish the poll in flight and return
+        self._stop = asyncio.Event()
 
         self.user_channels = {}
         self.user_format = {}
+        self.user_weights = {}
+        # /schedule for the user's next upload: uid -> parse_schedule() dict
+        self.user_schedule = {}
+        self.timers = TimerHeap()
+        self._timer_task = None
+
+        # write-behind: changes only mark the data dirty, _save_loop flushes it
+        self._dirty = False
+        self._save_lock = asyncio.Lock()
+        self._saver = None
 
         self._load_data()
         self.setup_handlers()
 
+        # unfinished jobs from the last run; handed to channel workers in _on_startup
+        self.store = PollStore()
+        self.resumed_jobs = self.store.unfinished_jobs()
+
     # ---------------------- Load & Save ----------------------
     def _load_data(self):
         if os.path.exists(DATA_FILE):
             try:
                 with open(DATA_FILE, "r", encoding="utf-8") as f:
                     data = json.load(f)
-                self.user_channels = {int(k): v for k, v in data.get("user_channels", {}).items()}
+                # older files hold a single channel per user
+                self.user_channels = {
+                    int(k): v if isinstance(v, list) else [v]
+                    for k, v in data.get("user_channels", {}).items()
+                }
                 self.user_format = {int(k): v for k, v in data.get("user_format", {}).items()}
+                self.user_weights = {int(k): v for k, v in data.get("user_weights", {}).items()}
+                self.user_schedule = {int(k): v for k, v in data.get("user_schedule", {}).items()}
             except Exception as e:
                 logger.error(f"_load_data error: {e}")
 
     def _save_data(self):
-        try:
+        # coalesced: the next _save_loop tick (or shutdown) writes DATA_FILE
+        self._dirty = True
+
+    async def _flush_data(self):
+        async with self._save_lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            # snapshot in the event loop, serialize + write in a worker thread
             data = {
                 "user_channels": {str(k): v for k, v in self.user_channels.items()},
-                "user_format": {str(k): v for k, v in self.user_format.items()}
+                "user_format": {str(k): v for k, v in self.user_format.items()},
+                "user_weights": {str(k): v for k, v in self.user_weights.items()},
+                "user_schedule": {str(k): v for k, v in self.user_schedule.items()}
             }
-            with open(DATA_FILE, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logger.error(f"_save_data error: {e}")
+            try:
+                await asyncio.to_thread(atomic_write_json, DATA_FILE, data)
+            except Exception as e:
+                self._dirty = True
+                logger.error(f"_save_data error: {e}")
+
+    async def _save_loop(self):
+        while True:
+            await asyncio.sleep(SAVE_INTERVAL)
+            await self._flush_data()
 
     # ---------------------- Helpers ----------------------
     def normalize_chat_id(self, raw):
@@ -76,6 +940,33 @@ class PollBot:
         except:
             return raw
 
+    def looks_like_csv(self, first_line):
+        lower_first = first_line.lower()
+        return ',' in first_line and (any(h in lower_first for h in ['question', 'questions', 'option1']) or lower_first.startswith('questions'))
+
+    def targets_for(self, uid):
+        return self.user_channels.get(uid) or []
+
+    def eta_line(self, counts, schedule=None):
+        if schedule:
+            return "🕒 " + describe_schedule(schedule, max(counts.values()))
+        est_min, est_sec = self.estimate_time(counts)
+        return f"⏱ Estimated time: ~{est_min} min {est_sec} sec"
+
+    def take_schedule(self, uid):
+        # a /schedule applies to the user's next upload only
+        schedule = self.user_schedule.pop(uid, None)
+        if schedule is None:
+            return None
+        self._save_data()
+        # a start time that passed while the schedule waited means "now"
+        return dict(schedule, start_at=max(schedule["start_at"], time.time()))
+
+    def estimate_time(self, counts):
+        # ETA from the limiter's current (learned) rate; channels are sent to in parallel
+        seconds = max((self.rate_limiter.estimate_seconds(t, n) for t, n in counts.items()), default=0)
+        return divmod(int(round(seconds)), 60)
+
     # ---------------------- Parsing (your original functions kept intact) ----------------------
     def parse_mcq_text(self, text):
         """
@@ -83,7 +974,7 @@ class PollBot:
          - Old format: Question 1: ... A. ... B. ... Correct Answer: A Explanation: ...
          - New format: Question. ... A) ... B) ... Ans: A Explanation ...
          - Mixed/variants: A. or A) or 'A )' etc. 'Correct Answer', 'Ans', 'Answer' accepted.
-        Returns list of polls: {question, options(list of 4), correct_answer(int 0-3), explanation}
+        Returns list of Polls: question, options (4), correct_answer (int 0-3), explanation
         """
 
         polls = []
@@ -93,111 +984,152 @@ class PollBot:
 
         # Split into blocks by headers like:
         # "Question 1:" or "Question:" or "Question." (case-insensitive)
-        blocks = re.split(r'(?i)Question\s*\d*\s*[:.]', t)
-        # If split produced an empty leading block (text before first Question), ignore it
-        for block in blocks:
+        for block in MCQ_BLOCK_SPLIT.split(t):
+            # If split produced an empty leading block (text before first Question), ignore it
             if not block or not block.strip():
                 continue
 
-            q_text = block.strip()
-
             try:
-                # 1) Extract question text: everything up to the first option (A. or A) or A ))
-                q_match = re.search(r'^(.*?)(?=\n\s*A[\.\)]|\n\s*A\s*\))', q_text, re.DOTALL | re.IGNORECASE)
-                if q_match:
-                    question = q_match.group(1).strip()
-                else:
-                    # If not found, maybe format is "Question.\nA) ..." and question is missing
-                    # Try to take the part before "A" line or first blank line
-                    lines = q_text.splitlines()
-                    if lines and not re.match(r'^\s*A[\.\)]', lines[0], re.IGNORECASE):
-                        question = lines[0].strip()
-                    else:
-                        question = ""  # fallback
-
-                # 2) Extract options A-D with flexible separators (., ), or ) with spaces)
-                option_a = re.search(r'A[\.\)]\s*(.*?)(?=\n\s*B[\.\)]|\n\s*C[\.\)]|\n\s*D[\.\)]|$)', q_text, re.DOTALL | re.IGNORECASE)
-                option_b = re.search(r'B[\.\)]\s*(.*?)(?=\n\s*C[\.\)]|\n\s*D[\.\)]|$)', q_text, re.DOTALL | re.IGNORECASE)
-                option_c = re.search(r'C[\.\)]\s*(.*?)(?=\n\s*D[\.\)]|$)', q_text, re.DOTALL | re.IGNORECASE)
-                option_d = re.search(r'D[\.\)]\s*(.*?)(?=\n|$)', q_text, re.DOTALL | re.IGNORECASE)
-
-                if not all([option_a, option_b, option_c, option_d]):
-                    # If options are on same line or different structure, try stricter pattern:
-                    # Look for lines that start with 'A' optionally followed by '.' or ')'
-                    lines = q_text.splitlines()
-                    opts = {}
-                    for line in lines:
-                        m = re.match(r'^\s*([A-D])\s*[\.\)]\s*(.*)', line, re.IGNORECASE)
-                        if m:
-                            opts[m.group(1).upper()] = m.group(2).strip()
-                    if all(k in opts for k in ['A', 'B', 'C', 'D']):
-                        option_a_text = opts['A']
-                        option_b_text = opts['B']
-                        option_c_text = opts['C']
-                        option_d_text = opts['D']
-                    else:
-                        # Can't parse options -> skip this block
-                        continue
-                else:
-                    option_a_text = option_a.group(1).strip()
-                    option_b_text = option_b.group(1).strip()
-                    option_c_text = option_c.group(1).strip()
-                    option_d_text = option_d.group(1).strip()
-
-                # 3) Correct answer: accept "Correct Answer:", "Correct answer:", "Ans:", "Answer:", etc.
-                corr = re.search(r'(?i)(?:Correct\s*Answer|Correct\s*answer|Answer|Ans)\s*[:.]?\s*([A-D])', q_text)
-                if not corr:
-                    # try one-line variant: "Ans.\nA" or "Ans\nA"
-                    corr = re.search(r'(?i)Ans\s*[:.]?\s*\n?\s*([A-D])', q_text)
-                if not corr:
-                    # If still not found, skip this block (we require correct answer)
-                    continue
-
-                correct_letter = corr.group(1).upper()
-                correct_index = ord(correct_letter) - ord('A')
-                if correct_index < 0 or correct_index > 3:
-                    continue
-
-                # 4) Explanation: optional, everything after 'Explanation' keyword
-                expl = ""
-                expl_match = re.search(r'(?i)Explanation\s*[:.]?\s*(.*)', q_text, re.DOTALL)
-                if expl_match:
-                    expl = expl_match.group(1).strip()
-
-                polls.append({
-                    "question": question if question else "(No question text)",
-                    "options": [
-                        option_a_text,
-                        option_b_text,
-                        option_c_text,
-                        option_d_text
-                    ],
-                    "correct_answer": correct_index,
-                    "explanation": expl
-                })
-
+                poll = self._parse_mcq_block(block.strip())
             except Exception as e:
                 # skip problematic block but continue parsing others
                 logger.error(f"parse error: {e}")
                 continue
+            if poll:
+                polls.append(poll)
 
         return polls
 
+    def _parse_mcq_block(self, q_text):
+        """
+        One pass over the block's lines, classifying option lines (A. / A) / A ) ...),
+        then the option texts are cut out by line index. Returns a Poll or None.
+        """
+        lines = q_text.split("\n")
+        n = len(lines)
+
+        q_end = None        # first "A." / "A)" line after line 0: the question ends there
+        first = {}          # letter -> first line starting with "X." / "X)"
+        last_loose = {}     # letter -> text of the last "X." / "X )" line (fallback)
+        markers = [None] * n
+        rests = [None] * n
+        offsets = [0] * n
+
+        pos = 0
+        for i, line in enumerate(lines):
+            offsets[i] = pos
+            pos += len(line) + 1
+
+            m = MCQ_OPTION_LINE.match(line)
+            if not m:
+                continue
+            letter = m.group(1).upper()
+            rest = line[m.end():]
+            last_loose[letter] = rest.strip()
+            if m.group(2):
+                # "A )": good enough to end the question, not for the main option path
+                if letter == 'A' and m.group(3) == ')' and q_end is None and i > 0:
+                    q_end = i
+                continue
+            markers[i] = letter
+            rests[i] = rest
+            first.setdefault(letter, i)
+            if letter == 'A' and q_end is None and i > 0:
+                q_end = i
+
+        # 1) question text: everything up to the first option line
+        body_start = 0
+        if q_end is not None:
+            question = "\n".join(lines[:q_end]).strip()
+            body_start = offsets[q_end]
+        elif markers[0] != 'A':
+            # If not found, maybe format is "Question.\nA) ..." and question is missing
+            question = lines[0].strip()
+            body_start = offsets[1] if n > 1 else len(q_text)
+        else:
+            question = ""  # fallback
+
+        # 2) options A-D; an option runs until the next line that starts a later option
+        if all(k in first for k in 'ABCD'):
+            options = [self._mcq_option_text(lines, markers, rests, first[k], k) for k in 'ABCD']
+        elif all(k in last_loose for k in 'ABCD'):
+            # If options have a space before the bracket ("A )"), take the text on the same line
+            options = [last_loose[k] for k in 'ABCD']
+        else:
+            # Can't parse options -> skip this block
+            return None
+
+        # 3) Correct answer: accept "Correct Answer:", "Correct answer:", "Ans:", "Answer:", "Ans.\nA" etc.
+        corr = MCQ_ANSWER.search(q_text, body_start)
+        if not corr:
+            # we require correct answer
+            return None
+        correct_index = ord(corr.group(1).upper()) - ord('A')
+
+        # 4) Explanation: optional, everything after 'Explanation' keyword
+        expl = ""
+        expl_match = MCQ_EXPLANATION.search(q_text, body_start)
+        if expl_match:
+            expl = expl_match.group(1).strip()
+
+        return Poll(question if question else "(No question text)", options, correct_index, expl)
+
+    @staticmethod
+    def _mcq_option_text(lines, markers, rests, i, letter):
+        head = rests[i].lstrip()
+        start = i
+        if not head:
+            # marker alone on its line ("A)\n text"): the text starts on the next non-blank line
+            start = i + 1
+            while start < len(lines) and not lines[start].strip():
+                start += 1
+            if start == len(lines):
+                return ""
+            head = lines[start].lstrip()
+        if letter == 'D':
+            # the last option is a single line
+            return head.strip()
+
+        stops = MCQ_OPTION_STOPS[letter]
+        parts = [head]
+        for k in range(start + 1, len(lines)):
+            if markers[k] in stops:
+                break
+            parts.append(lines[k])
+        return "\n".join(parts).strip()
+
+    def iter_mcq_polls(self, lines):
+        """
+        Streaming parse_mcq_text: takes an iterable of lines (e.g. an open file) and
+        yields polls as soon as each block is complete, holding one block at a time.
+        """
+        buf = []
+        for line in lines:
+            m = MCQ_BLOCK_SPLIT.search(line)
+            if m and buf:
+                # a new "Question ..." header closes the previous block
+                buf.append(line[:m.start()])
+                yield from self.parse_mcq_text("".join(buf))
+                buf = [line[m.start():]]
+            else:
+                buf.append(line)
+        if buf:
+            yield from self.parse_mcq_text("".join(buf))
+
     def parse_csv_text(self, text, strip_html=False):
+        return list(self.iter_csv_polls(StringIO(text), strip_html=strip_html))
+
+    def iter_csv_polls(self, f, strip_html=False):
         """
-        Read CSV text and convert rows to poll dicts compatible with existing logic.
+        Read CSV rows from a file-like object and yield Polls compatible with existing logic.
         Handles headers (case-insensitive) like:
         questions,option1,option2,option3,option4,option5,answer,explanation,type,section
 
         - answer can be A/B/C... or 1/2/3...
         - supports quoted fields with commas
-        - returns list of polls: {question, options(list), correct_answer (0-based int), explanation}
+        - yields Polls one row at a time: question, options, correct_answer (0-based int), explanation
         - strip_html: if True, HTML tags will be removed from question/explanation/options
         """
-        import csv
-        from io import StringIO
-
-        polls = []
 
         def clean_html(s):
             if s is None:
@@ -209,7 +1141,6 @@ class PollBot:
                 return re.sub(r'<[^>]+>', '', s).strip()
             return s
 
-        f = StringIO(text)
         try:
             reader = csv.DictReader(f)
         except Exception:
@@ -242,14 +1173,9 @@ class PollBot:
                 if correct_index is None or correct_index < 0 or correct_index >= len(opts):
                     continue
 
-                polls.append({
-                    "question": q or "(No question text)",
-                    "options": opts[:4],
-                    "correct_answer": correct_index,
-                    "explanation": expl
-                })
+                yield Poll(q or "(No question text)", opts[:4], correct_index, expl)
 
-            return polls
+            return
 
         # If using DictReader
         fieldnames = {fn.lower().strip(): fn for fn in (reader.fieldnames or [])}
@@ -341,14 +1267,7 @@ class PollBot:
             if correct_index is None or correct_index < 0 or correct_index >= len(opts):
                 continue
 
-            polls.append({
-                "question": question or "(No question text)",
-                "options": opts[:4],
-                "correct_answer": correct_index,
-                "explanation": explanation
-            })
-
-        return polls
+            yield Poll(question or "(No question text)", opts[:4], correct_index, explanation)
 
     # ---------------------- Formatting ----------------------
     def format_question(self, q, uid):
@@ -361,200 +1280,492 @@ class PollBot:
             return f"{e}\n\n{suffix}" if suffix else e
         return suffix if suffix else ""
 
-    # ---------------------- Poll Sending ----------------------
-    async def send_single_poll(self, ctx, poll, idx, total, chat, uid):
+    # ---------------------- Pre-flight ----------------------
+    def prepare_poll(self, poll, uid):
         """
-        Attempt to send poll preserving original message content.
-        If Telegram rejects due to length or entities, fallback:
-         - upload the ORIGINAL full text as a .txt document to the same chat (so nothing is lost)
-         - send a safe/truncated poll so the channel still gets a poll
+        Apply the user's prefix/suffix and check the result against Telegram's quiz limits
+        before the poll is queued, so send_poll never has to fail first.
+        Returns (prepared_poll, None) or (None, reason). Over-long texts are truncated
+        up front and the full original is kept in `full_text` to be posted as a .txt.
         """
-        # Keep original unmodified texts
-        q_original = self.format_question(poll["question"], uid)
-        ex_original = self.format_explanation(poll.get("explanation", ""), uid)
-        original_opts = list(poll["options"])
-
-        # make options list (non-empty)
-        opts = [o for o in original_opts if o is not None and str(o).strip() != ""]
-        if len(opts) < 2:
-            logger.error("Not enough non-empty options to send poll")
-            return False
+        question = self.format_question(poll.question, uid)
+        ex_original = self.format_explanation(poll.explanation, uid)
+        original_opts = list(poll.options)
+
+        # empty options are dropped; remap the correct option to the remaining ones
+        non_empty_indices = [i for i, o in enumerate(original_opts) if o is not None and str(o).strip()]
+        opts = [str(original_opts[i]) for i in non_empty_indices]
+        if len(opts) < POLL_MIN_OPTIONS:
+            return None, "২টির কম অপশন"
+        if len(opts) > POLL_MAX_OPTIONS:
+            return None, f"{POLL_MAX_OPTIONS}টির বেশি অপশন"
+        orig_correct = poll.correct_answer
+        if orig_correct not in non_empty_indices:
+            return None, "সঠিক উত্তরের অপশনটি খালি"
+        correct = non_empty_indices.index(orig_correct)
+
+        # explanation may hold at most 2 line feeds; the extra ones become spaces
+        explanation = ex_original
+        parts = explanation.split("\n")
+        if len(parts) - 1 > POLL_EXPLANATION_LINE_FEEDS:
+            keep = len(parts) - POLL_EXPLANATION_LINE_FEEDS
+            explanation = "\n".join([" ".join(parts[:keep])] + parts[keep:])
+
+        q_safe = tg_truncate(question, POLL_QUESTION_LIMIT, "\n\n[...truncated...]")
+        safe_opts = [tg_truncate(o, POLL_OPTION_LIMIT, "...") for o in opts]
+        ex_safe = tg_truncate(explanation, POLL_EXPLANATION_LIMIT, "...")
+
+        prepared = Poll(q_safe, safe_opts, correct, ex_safe)
+        if q_safe != question or safe_opts != opts or ex_safe != explanation:
+            # keep the ORIGINAL full text; it goes to the channel as a .txt before the poll
+            combined = "QUESTION:\n" + question + "\n\nOPTIONS:\n"
+            for i, o in enumerate(original_opts):
+                label = chr(ord('A') + i)
+                combined += f"{label}. {o}\n"
+            combined += "\nEXPLANATION:\n" + (ex_original or "")
+            prepared.full_text = combined
+        return prepared, None
+
+    def prepare_polls(self, polls, uid, report):
+        """
+        Yield prepared polls; rejected ones are recorded in report["rejected"] as
+        (number in upload, reason) and truncated ones counted in report["truncated"].
+        Works on lists and on streamed imports alike.
+        """
+        for n, poll in enumerate(polls, 1):
+            prepared, reason = self.prepare_poll(poll, uid)
+            if prepared is None:
+                report["rejected"].append((n, reason))
+                self.metrics.inc("polls_rejected_total")
+                continue
+            prepared.hash = poll_hash(poll)
+            if prepared.full_text:
+                report["truncated"] += 1
+                self.metrics.inc("polls_truncated_total")
+            yield prepared
 
-        # compute mapping for correct option
-        orig_correct = poll.get("correct_answer", 0)
-        non_empty_indices = [i for i, o in enumerate(original_opts) if o and str(o).strip()]
-        if orig_correct in non_empty_indices:
-            new_correct = non_empty_indices.index(orig_correct)
-        else:
-            new_correct = 0
+    def fan_out(self, polls, targets, report):
+        """
+        Yield (poll, targets that still need it). A channel that already has a poll
+        queued/sent skips it; those are counted per channel in report["duplicates"].
+        """
+        for poll in polls:
+            fresh = []
+            for target in targets:
+                if self.store.claim_hash(target, poll.hash):
+                    fresh.append(target)
+                else:
+                    report["duplicates"][target] = report["duplicates"].get(target, 0) + 1
+                    self.metrics.inc("polls_duplicate_total")
+            if fresh:
+                yield poll, fresh
+        for target in targets:
+            self.store.evict_hashes(target)
+
+    @staticmethod
+    def new_report():
+        return {"rejected": [], "truncated": 0, "duplicates": {}}
+
+    @staticmethod
+    def report_summary(report):
+        """One message for everything pre-flight found, or None if all polls are fine."""
+        lines = []
+        rejected = report["rejected"]
+        if rejected:
+            lines.append(f"⚠️ {len(rejected)} টি পোল বাদ দেওয়া হয়েছে:")
+            for n, reason in rejected[:REJECT_REPORT_LINES]:
+                lines.append(f" • #{n}: {reason}")
+            if len(rejected) > REJECT_REPORT_LINES:
+                lines.append(f" • ... আরও {len(rejected) - REJECT_REPORT_LINES} টি")
+        for target, n in report["duplicates"].items():
+            lines.append(f"♻️ {n} টি পোল আগেই {target} চ্যানেলে পাঠানো/কিউতে আছে — বাদ দেওয়া হয়েছে।")
+        if report["truncated"]:
+            lines.append(
+                f"✂️ {report['truncated']} টি পোল টেলিগ্রামের সীমার চেয়ে বড় — "
+                f"ছোট করে পাঠানো হবে, পূর্ণ লেখা .txt ফাইলে যাবে।"
+            )
+        return "\n".join(lines) if lines else None
 
-        # Try to send as-is (no forced parse mode) to avoid entity parse errors.
-        # This preserves the exact text the user provided (including HTML tags).
+    # ---------------------- Poll Sending ----------------------
+    async def send_single_poll(self, ctx, poll, idx, total, chat, uid):
+        t0 = time.perf_counter()
+        ok = await self._send_single_poll(ctx, poll, chat)
+        self.metrics.observe("send_poll_seconds", time.perf_counter() - t0)
+        if ok:
+            self.metrics.inc("polls_sent_total")
+        return ok
+
+    async def _send_single_poll(self, ctx, poll, chat):
+        """
+        Send a poll already checked by prepare_poll. The full text of a truncated
+        poll is not sent here; _send_next collects it for the job's next
+        original_polls.txt (see _flush_fallback).
+        """
         for attempt in range(RETRY_ATTEMPTS):
             try:
-                # rate limiting between polls
-                d = time.time() - self.last_poll_time
-                if d < DELAY_BETWEEN_POLLS:
-                    await asyncio.sleep(DELAY_BETWEEN_POLLS - d)
-
+                await self.rate_limiter.acquire(chat)
+                t_api = time.perf_counter()
                 await ctx.bot.send_poll(
                     chat_id=chat,
-                    question=q_original,
-                    options=opts,
+                    question=poll.question,
+                    options=poll.options,
                     type="quiz",
-                    correct_option_id=new_correct,
-                    explanation=ex_original or None,
+                    correct_option_id=poll.correct_answer,
+                    explanation=poll.explanation or None,
                     is_anonymous=True,
                     # do NOT set explanation_parse_mode so Telegram won't try to parse HTML entities –
                     # that way we keep the literal text intact (tags appear as plain text).
                     explanation_parse_mode=None
                 )
+                self.metrics.observe("telegram_api_seconds", time.perf_counter() - t_api)
 
-                self.last_poll_time = time.time()
+                self.rate_limiter.on_success(chat)
                 return True
 
             except RetryAfter as e:
-                await asyncio.sleep(e.retry_after + 1)
+                # back off; the next acquire() waits out the block
+                wait = retry_after_seconds(e)
+                self.metrics.inc("retry_after_total")
+                self.metrics.inc("retry_after_wait_seconds_total", wait)
+                self.rate_limiter.on_retry_after(chat, wait + 1)
             except BadRequest as e:
-                err = str(e)
-                logger.error(f"send_single_poll BadRequest: {err}")
-
-                # If message too long or can't parse entities -> fallback
-                if 'Message is too long' in err or "Can't parse entities" in err or 'unsupported start tag' in err:
-                    # 1) Upload the original content as a .txt file to the target chat so nothing is lost.
-                    try:
-                        combined = "QUESTION:\n" + q_original + "\n\nOPTIONS:\n"
-                        for i, o in enumerate(original_opts):
-                            label = chr(ord('A') + i)
-                            combined += f"{label}. {o}\n"
-                        combined += "\nEXPLANATION:\n" + (ex_original or "")
-                        bio = BytesIO(combined.encode('utf-8'))
-                        bio.name = "original_poll.txt"
-                        await ctx.bot.send_document(chat_id=chat, document=bio, caption="Full original poll content (raw).")
-                    except Exception as doc_e:
-                        logger.error(f"Failed to send original content as document: {doc_e}")
-
-                    # 2) Prepare safe truncated versions for poll (so poll can be posted)
-                    q_safe = q_original
-                    ex_safe = ex_original
-                    safe_opts = list(opts)
-
-                    if len(q_safe) > FALLBACK_QUESTION_LIMIT:
-                        q_safe = q_safe[:FALLBACK_QUESTION_LIMIT-12].rstrip() + "\n\n[...truncated...]"
-                    # truncate options if required
-                    for i, o in enumerate(safe_opts):
-                        if len(o) > FALLBACK_OPTION_LIMIT:
-                            safe_opts[i] = o[:FALLBACK_OPTION_LIMIT-12].rstrip() + "..."
-                    if ex_safe and len(ex_safe) > FALLBACK_EXPLANATION_LIMIT:
-                        ex_safe = ex_safe[:FALLBACK_EXPLANATION_LIMIT-12].rstrip() + "\n\n[...truncated...]"
-
-                    # Try sending truncated poll (still without parse_mode)
-                    try:
-                        await ctx.bot.send_poll(
-                            chat_id=chat,
-                            question=q_safe,
-                            options=safe_opts,
-                            type="quiz",
-                            correct_option_id=new_correct if new_correct < len(safe_opts) else 0,
-                            explanation=ex_safe or None,
-                            is_anonymous=True,
-                            explanation_parse_mode=None
-                        )
-                        self.last_poll_time = time.time()
-                        return True
-                    except Exception as inner_e:
-                        logger.error(f"Fallback truncated poll failed: {inner_e}")
-                        return False
-                else:
-                    # other BadRequest types (e.g., chat not found, poll not allowed)
-                    logger.error(f"Unhandled BadRequest: {err}")
-                    return False
+                # limits were checked up front, so this is e.g. chat not found / poll not allowed
+                logger.error(f"send_single_poll BadRequest: {e}")
+                self.metrics.inc("polls_failed_total", reason="bad_request")
+                return False
             except Forbidden as e:
                 logger.error(f"Forbidden: {e}")
+                self.metrics.inc("polls_failed_total", reason="forbidden")
                 return False
             except Exception as e:
+                if self._stopping():
+                    # not the poll's fault: leave its row pending so the next start sends it
+                    raise
                 logger.error(f"send_single_poll error: {e}")
+                self.metrics.inc("polls_failed_total", reason="error")
                 return False
 
+        self.metrics.inc("polls_failed_total", reason="retries_exhausted")
         return False
 
     # ---------------------- Queue Processor ----------------------
     async def process_queue(self, ctx, uid):
+        """
+        Hand this user's queued polls to the workers of their target channels, one job
+        per channel. Returns right away; different channels are drained in parallel,
+        jobs sharing a channel are interleaved by its FairScheduler.
+        """
+        t0 = time.perf_counter()
+        try:
+            await self._process_queue(ctx, uid)
+        finally:
+            self.metrics.observe("process_queue_seconds", time.perf_counter() - t0)
 
-        if self.is_processing:
-            return
-
-        self.is_processing = True
-        self.current_user_id = uid
-
-        my_polls = []
-        others = deque()
-
-        # Collect polls belonging to this user; keep others in queue
-        while self.poll_queue:
-            item = self.poll_queue.popleft()
-            if item.get("owner_user_id") == uid:
-                my_polls.append(item["poll_data"])
-            else:
-                others.append(item)
+    def enqueue_polls(self, uid, per_target):
+        # per_target: channel -> polls that channel still needs
+        mine = self.user_queues.setdefault(uid, {})
+        for target, polls in per_target.items():
+            mine.setdefault(target, deque()).extend(polls)
 
-        self.poll_queue = others
+    async def _process_queue(self, ctx, uid):
+        # only this user's entry is touched, other users' queued polls stay where they are
+        my_polls = self.user_queues.pop(uid, None)
 
         if not my_polls:
             try:
                 await ctx.bot.send_message(uid, "❌ আপনার কিউতে কোনো পোল নেই।")
             except Exception:
                 pass
-            self.is_processing = False
-            self.current_user_id = None
             return
 
-        target = self.user_channels.get(uid)
-        if not target:
-            try:
-                await ctx.bot.send_message(uid, "❌ কোনো চ্যানেল সেট করা নেই। /setchannel ব্যবহার করুন।")
-            except Exception:
-                pass
-            self.is_processing = False
-            self.current_user_id = None
-            return
-
-        total = len(my_polls)
-        sent = 0
-
-        # Inform start of sending
-        try:
-            await ctx.bot.send_message(uid, "Starting to send...")
-        except Exception:
-            pass
-
-        # Send in batches
-        while my_polls:
-            batch = my_polls[:POLLS_PER_BATCH]
-            my_polls = my_polls[POLLS_PER_BATCH:]
+        group = self._new_group(uid)
+        schedule = self.take_schedule(uid)
+        for target, polls in my_polls.items():
+            job_id = self.store.add_job(uid, target, polls, schedule)
+            self._submit_job(ctx, self._new_job(job_id, uid, target, len(polls), group=group, schedule=schedule))
+
+    @staticmethod
+    def _new_group(uid):
+        # the jobs of one upload (one per channel), reported together when the last one ends;
+        # "progress" is the message edited in place while they run
+        return {
+            "owner_user_id": uid, "jobs": [], "left": 0, "started": False,
+            "progress": None, "progress_text": None, "last_edit": 0.0, "edit_due": None, "finished": False,
+        }
+
+    def _submit_job(self, ctx, job):
+        job.group["left"] += 1
+        self._channel_scheduler(ctx, job.target).add(job)
+
+    def _new_job(self, job_id, uid, target, total, resumed=False, feeding=False, group=None, schedule=None,
+                 paused=False):
+        # a new Job, indexed by id and by owner
+        if group is None:
+            group = self._new_group(uid)
+        job = Job(job_id, uid, target, total, group,
+                  resumed=resumed, feeding=feeding, schedule=schedule, paused=paused)
+        group["jobs"].append(job)
+        self.jobs[job_id] = job
+        self.user_jobs.setdefault(uid, {})[job_id] = job
+        return job
+
+    def _drop_job(self, job):
+        self.jobs.pop(job.job_id, None)
+        mine = self.user_jobs.get(job.owner_user_id)
+        if mine is not None:
+            mine.pop(job.job_id, None)
+            if not mine:
+                del self.user_jobs[job.owner_user_id]
+
+    def jobs_for_user(self, uid):
+        return list(self.user_jobs.get(uid, {}).values())
+
+    def weight_of(self, uid):
+        return self.user_weights.get(uid, DEFAULT_USER_WEIGHT)
+
+    def _channel_scheduler(self, ctx, target):
+        # start (or restart, if it died) the worker for this channel on first use
+        sched = self.channel_queues.get(target)
+        if sched is None:
+            sched = FairScheduler(self.weight_of)
+            self.channel_queues[target] = sched
+        worker = self.channel_workers.get(target)
+        if (worker is None or worker.done()) and not self._stop.is_set():
+            self.channel_workers[target] = asyncio.create_task(self._channel_worker(ctx, target, sched))
+        return sched
+
+    def _wake(self, target):
+        sched = self.channel_queues.get(target)
+        if sched:
+            sched.changed.set()
+
+    def _job_ready(self, job):
+        # checked between sends, so /pause and /cancel take effect after the poll in flight
+        if job.cancelled:
+            job.done = True
+            return False
+        if job.paused:
+            return False
 
-            for poll in batch:
-                ok = await self.send_single_poll(ctx, poll, sent + 1, total, target, uid)
-                if ok:
-                    sent += 1
+        # refill the job's buffer from the queue db a page at a time
+        if not job.buffer:
+            page = self.store.pending_polls(job.job_id, job.last_seq)
+            if not page:
+                if not job.feeding:
+                    job.done = True
+                return False
+            job.buffer.extend(page)
+            job.last_seq = page[-1][0]
+
+        due = poll_due(job.schedule, job.buffer[0][0])
+        if due > time.time():
+            # not yet; the timer heap wakes this channel's worker when it is
+            if job.timer_at != due:
+                job.timer_at = due
+                self.timers.push(due, lambda target=job.target: self._wake(target))
+            return False
+        return True
+
+    def _stopping(self):
+        # shutdown has begun, or this task was cancelled (even if a library swallowed the CancelledError)
+        task = asyncio.current_task()
+        cancelling = getattr(task, "cancelling", None)  # Python 3.11+
+        return self._stop.is_set() or bool(cancelling and cancelling())
+
+    async def _channel_worker(self, ctx, target, sched):
+        while not self._stop.is_set():
+            while sched.finished:
+                await self._finish_job(ctx, sched.finished.pop(0))
+
+            job = sched.pick(self._job_ready)
+            if job is None:
+                if not sched.finished:
+                    sched.changed.clear()
+                    await sched.changed.wait()
+                continue
 
-            if my_polls:
+            try:
+                await self._send_next(ctx, job, target)
+            except Exception as e:
+                if self._stopping():
+                    return
+                logger.error(f"channel worker error ({target}): {e}")
+
+    async def _send_next(self, ctx, job, target):
+        uid = job.owner_user_id
+        if job.started_at is None:
+            job.started_at = time.perf_counter()
+            self.metrics.inc("jobs_started_total")
+            # one progress message per upload, edited from then on
+            group = job.group
+            if not group["started"]:
+                group["started"] = True
+                group["progress_text"] = self.progress_text(group)
+                group["last_edit"] = time.time()
                 try:
-                    await ctx.bot.send_message(uid, f"⏸ {BREAK_BETWEEN_BATCHES}s বিরতি...")
+                    group["progress"] = await ctx.bot.send_message(uid, group["progress_text"])
                 except Exception:
                     pass
-                await asyncio.sleep(BREAK_BETWEEN_BATCHES)
 
+        seq, poll = job.buffer.popleft()
+        done = job.sent + job.failed
+        # raises on shutdown/cancellation, before any status is written or the hash forgotten
+        ok = await self.send_single_poll(ctx, poll, done + 1, job.total, target, uid)
+        self.store.set_status(job.job_id, seq, "sent" if ok else "failed")
+        if ok:
+            job.sent += 1
+        else:
+            job.failed += 1
+            if poll.hash:
+                self.store.forget_hash(target, poll.hash)
+        if poll.full_text:
+            # numbered by position in the upload, so a resumed job continues the count
+            job.fallback.append((seq + 1, poll.full_text))
+            if len(job.fallback) >= FALLBACK_BATCH_SIZE:
+                self._flush_fallback(ctx, job)
+        self._progress_changed(ctx, job.group)
+
+    def _flush_fallback(self, ctx, job):
+        # upload in the background, the channel worker goes straight on with the next poll
+        if not job.fallback:
+            return
+        entries, job.fallback = job.fallback, []
+        task = asyncio.create_task(self._send_fallback_doc(ctx, job.target, entries))
+        self.fallback_tasks.add(task)
+        task.add_done_callback(self.fallback_tasks.discard)
+
+    async def _send_fallback_doc(self, ctx, chat, entries):
+        """One .txt with the ORIGINAL full text of a batch of truncated polls, so nothing is lost."""
+        text = "\n\n----------\n\n".join(f"#{n}\n{full}" for n, full in entries)
+        first, last = entries[0][0], entries[-1][0]
+        numbers = f"#{first}" if first == last else f"#{first}–#{last}"
+        caption = f"Full original content of {len(entries)} truncated poll(s) ({numbers})."
+        for attempt in range(RETRY_ATTEMPTS):
+            bio = BytesIO(text.encode('utf-8'))
+            bio.name = "original_polls.txt"
+            try:
+                await self.rate_limiter.acquire(chat)
+                await ctx.bot.send_document(chat_id=chat, document=bio, caption=caption)
+                self.metrics.inc("fallback_docs_total")
+                return
+            except RetryAfter as e:
+                self.rate_limiter.on_retry_after(chat, retry_after_seconds(e) + 1)
+            except Exception as doc_e:
+                logger.error(f"Failed to send original content as document: {doc_e}")
+                return
+        logger.error(f"Failed to send original content as document ({chat}): retries exhausted")
+
+    # ---------------------- Progress ----------------------
+    def progress_text(self, group, final=False):
+        jobs = [j for j in group["jobs"] if j.total]
+        running = [j for j in jobs if not j.cancelled]
+        if final:
+            head = "✅ Finished" if running else "🛑 Cancelled"
+        elif not running:
+            head = "🛑 Cancelling..."
+        elif all(j.paused for j in running):
+            head = "⏸ Paused — /resume to continue"
+        elif any(j.resumed for j in jobs):
+            head = "♻️ Resuming unfinished job..."
+        else:
+            head = "📤 Sending polls..."
+        lines = [head]
+        now = time.time()
+        eta = 0
+        for job in jobs:
+            line = f"{job.sent}/{job.total} sent"
+            if job.failed:
+                line += f", {job.failed} failed"
+            if len(jobs) > 1 and (job.cancelled or job.paused):
+                line += " (cancelled)" if job.cancelled else " (paused)"
+            lines.append(f" • {job.target}: {line}" if len(jobs) > 1 else line)
+            left = job.total - job.sent - job.failed
+            if left and not job.cancelled and not job.paused:
+                if job.schedule:
+                    eta = max(eta, poll_due(job.schedule, job.total - 1) - now)
+                else:
+                    eta = max(eta, self.rate_limiter.estimate_seconds(job.target, left))
+        if not final and eta > 0:
+            est_min, est_sec = divmod(int(round(eta)), 60)
+            lines.append(f"⏱ ~{est_min} min {est_sec} sec left")
+        return "\n".join(lines)
+
+    def _progress_changed(self, ctx, group):
+        # coalesce updates: at most one edit per PROGRESS_EDIT_INTERVAL, fired from the timer heap
+        if group["progress"] is None or group["edit_due"] is not None or group["finished"]:
+            return
+        due = max(time.time(), group["last_edit"] + PROGRESS_EDIT_INTERVAL)
+        group["edit_due"] = due
+        self.timers.push(due, lambda: self._start_edit(ctx, group))
+
+    def _start_edit(self, ctx, group):
+        group["edit_due"] = None
+        if not group["finished"]:
+            # keep a reference so the task isn't garbage collected mid-edit
+            group["edit_task"] = asyncio.create_task(self._edit_progress(ctx, group))
+
+    async def _edit_progress(self, ctx, group, final=False):
+        text = self.progress_text(group, final)
+        if group["progress"] is None or text == group["progress_text"]:
+            return
+        group["progress_text"] = text
+        group["last_edit"] = time.time()
         try:
-            await ctx.bot.send_message(
-                uid,
-                f"✅ All done! Successfully sent {sent}/{total} polls to the channel."
+            await ctx.bot.edit_message_text(
+                text, chat_id=group["owner_user_id"], message_id=group["progress"].message_id
             )
+            self.metrics.inc("progress_edits_total")
+        except RetryAfter as e:
+            # try again once Telegram lets us
+            group["last_edit"] = time.time() + retry_after_seconds(e)
+            group["progress_text"] = None
+            self._progress_changed(ctx, group)
+        except Exception as e:
+            logger.error(f"progress edit error: {e}")
+
+    async def _finish_job(self, ctx, job):
+        self._flush_fallback(ctx, job)
+        if job.cancelled:
+            self.store.release_pending_hashes(job.job_id, job.target)
+            self.metrics.inc("jobs_cancelled_total")
+        self.store.finish_job(job.job_id)
+        self._drop_job(job)
+        if job.started_at is not None:
+            self.metrics.inc("jobs_finished_total")
+            self.metrics.observe("job_seconds", time.perf_counter() - job.started_at)
+
+        group = job.group
+        group["left"] -= 1
+        if group["left"] > 0:
+            return
+        group["finished"] = True
+        await self._edit_progress(ctx, group, final=True)
+        try:
+            await ctx.bot.send_message(group["owner_user_id"], self.final_report(group))
         except Exception:
             pass
 
-        self.is_processing = False
-        self.current_user_id = None
+    @staticmethod
+    def final_report(group):
+        jobs = [j for j in group["jobs"] if j.total]
+        if len(jobs) == 1:
+            job = jobs[0]
+            if job.cancelled:
+                return f"🛑 Cancelled. Sent {job.sent}/{job.total} polls before stopping."
+            return f"✅ All done! Successfully sent {job.sent}/{job.total} polls to the channel."
+        # same rule as progress_text(final=True): cancelled only if nothing ran to the end
+        if all(j.cancelled for j in jobs):
+            lines = [f"🛑 Cancelled. Sent to {len(jobs)} channels before stopping:"]
+        else:
+            lines = [f"✅ All done! Sent to {len(jobs)} channels:"]
+        for job in jobs:
+            line = f" • {job.target}: {job.sent}/{job.total}"
+            if job.failed:
+                line += f" ({job.failed} failed)"
+            if job.cancelled:
+                line += " — cancelled"
+            lines.append(line)
+        return "\n".join(lines)
 
     # ---------------------- Commands ----------------------
     async def start(self, u: Update, c: ContextTypes.DEFAULT_TYPE):
@@ -568,6 +1779,9 @@ class PollBot:
  /setchannel -1001234567890
  /setchannel @mychannel
 
+একাধিক চ্যানেলে একসাথে পাঠাতে:
+ /setchannel @channel1 @channel2
+
 (চ্যানেলে বটকে অ্যাড করে এবং পোস্ট করার অনুমতি দিন)
 
 এখানে ফরম্যাট সেট করুন (ঐচ্ছিক):
@@ -576,6 +1790,16 @@ class PollBot:
 উদাহরণ:
  /setformat [SOT] || [@SOT_Academy]
 
+নির্দিষ্ট সময়ে পাঠাতে (পরের আপলোডের জন্য, ঐচ্ছিক):
+ /schedule 09:00 10/1h   — সকাল ৯টা থেকে প্রতি ঘণ্টায় ১০টি
+ /schedule +30m          — ৩০ মিনিট পরে সব একসাথে
+ /schedule off
+
+চলমান আপলোড নিয়ন্ত্রণ:
+ /queue            — আপনার চলমান জব
+ /pause, /resume   — সব জব থামান / আবার চালু করুন (অথবা /pause <job_id>)
+ /cancel           — সর্বশেষ আপলোড বাতিল (/cancel <job_id> অথবা /cancel all)
+
 তারপর MCQ টেক্সট পাঠান — বট নিম্নোক্ত দুই ফরম্যাটই পার্স করবে:
 
 ফরম্যাট-১ -
@@ -601,6 +1825,9 @@ Explanation: ...
 
 অথবা CSV ফরম্যাটও পাঠাতে পারেন:
 Question,Option1,Option2,Option3,Option4,Option5,Answer,Explanation
+
+বড় প্রশ্নব্যাংক হলে .csv / .txt ফাইল হিসেবে আপলোড করুন —
+প্রথম প্রশ্ন পার্স হওয়ার সাথে সাথেই পাঠানো শুরু হবে।
 """
         if u.message:
             await u.message.reply_text(welcome)
@@ -613,15 +1840,21 @@ Question,Option1,Option2,Option3,Option4,Option5,Answer,Explanation
         uid = u.effective_user.id if u.effective_user else None
         if uid is None:
             return
-        if not c.args:
+        # one or more channels, separated by spaces or commas
+        raw = [r for arg in c.args for r in arg.split(",") if r.strip()]
+        if not raw:
             if u.message:
-                await u.message.reply_text("ব্যবহার: /setchannel <channel_id_or_username>")
+                await u.message.reply_text("ব্যবহার: /setchannel <channel_id_or_username> [আরও চ্যানেল ...]")
             return
-        raw = c.args[0]
-        self.user_channels[uid] = self.normalize_chat_id(raw)
+        targets = []
+        for r in raw:
+            target = self.normalize_chat_id(r)
+            if target not in targets:
+                targets.append(target)
+        self.user_channels[uid] = targets
         self._save_data()
         if u.message:
-            await u.message.reply_text(f"✅ Channel set: {raw}")
+            await u.message.reply_text(f"✅ Channel set: {', '.join(raw)}")
 
     async def setformat(self, u: Update, c: ContextTypes.DEFAULT_TYPE):
         uid = u.effective_user.id if u.effective_user else None
@@ -641,6 +1874,221 @@ Question,Option1,Option2,Option3,Option4,Option5,Answer,Explanation
         if u.message:
             await u.message.reply_text("✅ Format saved!")
 
+    async def schedule(self, u: Update, c: ContextTypes.DEFAULT_TYPE):
+        uid = u.effective_user.id if u.effective_user else None
+        if uid is None or not u.message:
+            return
+
+        if not c.args:
+            lines = []
+            if uid in self.user_schedule:
+                lines.append("Next upload — " + describe_schedule(self.user_schedule[uid]))
+            for job in self.jobs_for_user(uid):
+                if job.schedule:
+                    waiting = job.timer_at and job.timer_at > time.time()
+                    lines.append(f"{job.target}: {job.sent}/{job.total} sent, "
+                                 + (f"next polls at {format_when(job.timer_at)}" if waiting else "sending now"))
+            await u.message.reply_text("\n".join(lines) if lines else
+                                       "কোনো শিডিউল নেই। ব্যবহার: /schedule <HH:MM | YYYY-MM-DD HH:MM | +30m> [10/1h]")
+            return
+
+        if c.args[0].lower() == "off":
+            self.user_schedule.pop(uid, None)
+            self._save_data()
+            await u.message.reply_text("✅ Schedule cleared — polls will be sent right away.")
+            return
+
+        try:
+            schedule = parse_schedule(c.args)
+        except ValueError:
+            await u.message.reply_text(
+                "ব্যবহার: /schedule <HH:MM | YYYY-MM-DD HH:MM | +30m> [<polls>/<every>]\n"
+                "উদাহরণ: /schedule 09:00 10/1h  — সকাল ৯টা থেকে প্রতি ঘণ্টায় ১০টি পোল"
+            )
+            return
+        self.user_schedule[uid] = schedule
+        self._save_data()
+        await u.message.reply_text(f"✅ {describe_schedule(schedule)}\nপরের আপলোড এই সময়সূচিতে পাঠানো হবে।")
+
+    # ---------------------- Job control ----------------------
+    def _pick_jobs(self, uid, args, latest_only=False):
+        """
+        The caller's own jobs a /pause, /resume or /cancel applies to: one job id,
+        "all", or by default all of them (latest_only: just the most recent upload).
+        None for an id that isn't one of theirs.
+        """
+        mine = self.jobs_for_user(uid)
+        if args and args[0].lower() != "all":
+            try:
+                job = self.user_jobs.get(uid, {}).get(int(args[0].lstrip("#")))
+            except ValueError:
+                return None
+            return [job] if job else None
+        if latest_only and mine and not args:
+            group = max(mine, key=lambda j: j.job_id).group
+            return [j for j in mine if j.group is group]
+        return mine
+
+    def _groups_changed(self, ctx, jobs):
+        for group in {id(j.group): j.group for j in jobs}.values():
+            self._progress_changed(ctx, group)
+
+    async def queue(self, u: Update, c: ContextTypes.DEFAULT_TYPE):
+        uid = u.effective_user.id if u.effective_user else None
+        if uid is None or not u.message:
+            return
+
+        lines = []
+        now = time.time()
+        for job in sorted(self.jobs_for_user(uid), key=lambda j: j.job_id):
+            sched = self.channel_queues.get(job.target)
+            if job.cancelled:
+                state = "🛑 cancelling"
+            elif job.paused:
+                state = "⏸ paused"
+            elif sched and job in sched.held:
+                state = "waiting for your other jobs in this channel"
+            elif job.timer_at and job.timer_at > now:
+                state = f"🕒 next polls at {format_when(job.timer_at)}"
+            else:
+                state = "📤 sending"
+            line = f"#{job.job_id} → {job.target}: {job.sent}/{job.total} sent"
+            if job.failed:
+                line += f", {job.failed} failed"
+            if job.feeding:
+                line += " (still importing)"
+            lines.append(f"{line} — {state}")
+        asm = self.assemblers.get(uid)
+        if asm:
+            lines.append(f"📝 Long paste being joined: {len(asm.polls)} polls so far")
+        if not lines:
+            await u.message.reply_text("📭 আপনার কোনো চলমান জব নেই।")
+            return
+        lines.append("\n/pause, /resume, /cancel [job_id | all]")
+        await u.message.reply_text("📋 Your jobs:\n" + "\n".join(lines))
+
+    async def _set_paused(self, u, c, paused):
+        uid = u.effective_user.id if u.effective_user else None
+        if uid is None or not u.message:
+            return
+
+        jobs = self._pick_jobs(uid, c.args)
+        if jobs is None:
+            await u.message.reply_text("❌ এই আইডির কোনো জব নেই। /queue দেখুন।")
+            return
+        jobs = [j for j in jobs if j.paused != paused and not j.cancelled]
+        if not jobs:
+            await u.message.reply_text("কোনো পরিবর্তন নেই — /queue দেখুন।")
+            return
+
+        for job in jobs:
+            job.paused = paused
+            self.store.set_paused(job.job_id, paused)
+            if not paused:
+                self._wake(job.target)
+        self._groups_changed(c, jobs)
+        if paused:
+            await u.message.reply_text(
+                f"⏸ Paused {len(jobs)} job(s) after the poll being sent. Nothing is lost — /resume to continue."
+            )
+        else:
+            await u.message.reply_text(f"▶️ Resumed {len(jobs)} job(s).")
+
+    async def pause(self, u: Update, c: ContextTypes.DEFAULT_TYPE):
+        await self._set_paused(u, c, True)
+
+    async def resume(self, u: Update, c: ContextTypes.DEFAULT_TYPE):
+        await self._set_paused(u, c, False)
+
+    async def cancel(self, u: Update, c: ContextTypes.DEFAULT_TYPE):
+        uid = u.effective_user.id if u.effective_user else None
+        if uid is None or not u.message:
+            return
+
+        jobs = self._pick_jobs(uid, c.args, latest_only=True)
+        if jobs is None:
+            await u.message.reply_text("❌ এই আইডির কোনো জব নেই। /queue দেখুন।")
+            return
+        jobs = [j for j in jobs if not j.cancelled]
+        if not jobs:
+            await u.message.reply_text("📭 বাতিল করার মতো কোনো জব নেই।")
+            return
+
+        for job in jobs:
+            # the channel worker sees this before its next send and retires the job
+            job.cancelled = True
+            sched = self.channel_queues.get(job.target)
+            if sched:
+                sched.cancel(job)
+        self._groups_changed(c, jobs)
+        left = len(self.jobs_for_user(uid)) - len(jobs)
+        msg = f"🛑 Cancelling {len(jobs)} job(s) — stopping after the poll being sent."
+        if left:
+            msg += f"\nYour other {left} job(s) keep running."
+        await u.message.reply_text(msg)
+
+    async def setweight(self, u: Update, c: ContextTypes.DEFAULT_TYPE):
+        uid = u.effective_user.id if u.effective_user else None
+        if uid not in ADMIN_USER_IDS or not u.message:
+            return
+
+        try:
+            target_uid, weight = int(c.args[0]), int(c.args[1])
+            if weight < 1:
+                raise ValueError
+        except (IndexError, ValueError):
+            await u.message.reply_text("ব্যবহার: /setweight <user_id> <weight>  (weight ≥ 1)")
+            return
+
+        if weight == DEFAULT_USER_WEIGHT:
+            self.user_weights.pop(target_uid, None)
+        else:
+            self.user_weights[target_uid] = weight
+        self._save_data()
+        await u.message.reply_text(f"✅ Weight for {target_uid} set to {weight}")
+
+    async def stats(self, u: Update, c: ContextTypes.DEFAULT_TYPE):
+        uid = u.effective_user.id if u.effective_user else None
+        if uid not in ADMIN_USER_IDS or not u.message:
+            return
+
+        m = self.metrics
+        g = self.metric_gauges()
+        send = m.histograms.get("send_poll_seconds") or Histogram()
+        api = m.histograms.get("telegram_api_seconds") or Histogram()
+        failed = m.counters.get("polls_failed_total", {})
+        uptime = int(time.time() - m.started)
+        lines = [
+            "📈 Poll Bot stats",
+            f"Uptime: {uptime // 3600}h {uptime % 3600 // 60}m",
+            f"Queue: {g['queue_pending_polls']} polls pending, {g['queued_jobs']} jobs scheduled, {g['channel_workers']} workers",
+            f"Sent: {m.total('polls_sent_total')}  Failed: {m.total('polls_failed_total')}"
+            + (" (" + ", ".join(f"{k}: {v}" for k, v in failed.items()) + ")" if failed else ""),
+            f"Rejected: {m.total('polls_rejected_total')}  Truncated: {m.total('polls_truncated_total')}"
+            f"  Fallback docs: {m.total('fallback_docs_total')}",
+            f"RetryAfter: {m.total('retry_after_total')} ({m.total('retry_after_wait_seconds_total'):.0f}s waited)",
+            f"send_single_poll: avg {send.sum / send.count if send.count else 0:.2f}s, "
+            f"p50 ≤{send.quantile(0.5):g}s, p95 ≤{send.quantile(0.95):g}s",
+            f"sendPoll API: avg {api.sum / api.count if api.count else 0:.2f}s, p95 ≤{api.quantile(0.95):g}s",
+        ]
+        await u.message.reply_text("\n".join(lines))
+
+    def metric_gauges(self):
+        return {
+            "queue_pending_polls": self.store.pending_count(),
+            "queued_jobs": sum(q.qsize() for q in self.channel_queues.values()),
+            "channel_workers": sum(1 for w in self.channel_workers.values() if not w.done()),
+        }
+
+    async def _metrics_loop(self):
+        while True:
+            await asyncio.sleep(METRICS_INTERVAL)
+            try:
+                text = self.metrics.render(self.metric_gauges())
+                await asyncio.to_thread(atomic_write_text, METRICS_FILE, text)
+            except Exception as e:
+                logger.error(f"metrics write error: {e}")
+
     async def handle_text(self, u: Update, c: ContextTypes.DEFAULT_TYPE):
         # robust uid and text extraction
         uid = u.effective_user.id if u.effective_user else None
@@ -655,30 +2103,36 @@ Question,Option1,Option2,Option3,Option4,Option5,Answer,Explanation
                 await u.message.reply_text("No text found in update.")
             return
 
+        # ---------------- split long paste ----------------
+        if uid in self.assemblers or (len(text) >= ASSEMBLE_MIN_LEN and not self.looks_like_csv(text.split("\n", 1)[0])):
+            self._assemble(u, c, uid, text)
+            return
+
         # ---------------- CSV detection ----------------
         first_line = text.splitlines()[0] if text.strip() else ""
         if first_line:
-            lower_first = first_line.lower()
-            if (',' in first_line and (any(h in lower_first for h in ['question', 'questions', 'option1']) or lower_first.startswith('questions'))):
+            if self.looks_like_csv(first_line):
                 polls = self.parse_csv_text(text, strip_html=False)
                 if not polls:
                     if u.message:
                         await u.message.reply_text("❌ CSV পার্স করা যায়নি — ফরম্যাট পরীক্ষা করুন।")
                     return
 
-                for p in polls:
-                    # do NOT modify the original texts — keep them as-is
-                    self.poll_queue.append({"owner_user_id": uid, "poll_data": p})
+                queued = await self._preflight(u, polls, uid)
+                if not queued:
+                    return
+
+                # do NOT modify the original texts — keep them as-is
+                self.enqueue_polls(uid, queued)
 
-                total = len(polls)
-                batches = (total - 1) // POLLS_PER_BATCH + 1
-                est_seconds = total * DELAY_BETWEEN_POLLS + max(0, batches - 1) * BREAK_BETWEEN_BATCHES
-                est_min = est_seconds // 60
-                est_sec = est_seconds % 60
+                counts = {t: len(p) for t, p in queued.items()}
+                total = max(counts.values())
+                schedule = self.user_schedule.get(uid)
 
                 if u.message:
                     await u.message.reply_text(
-                        f"📁 CSV detected!\n✓ Loaded {total} polls.\nAdded to queue!\nWill be sent in {batches} batch(es)\n⏱ Estimated time: ~{est_min} min {est_sec} sec\nStarting to send..."
+                        f"📁 CSV detected!\n✓ Loaded {total} polls.\nAdded to queue!\n{self.eta_line(counts, schedule)}"
+                        + ("" if schedule else "\nStarting to send...")
                     )
 
                 await self.process_queue(c, uid)
@@ -690,35 +2144,212 @@ Question,Option1,Option2,Option3,Option4,Option5,Answer,Explanation
                 await u.message.reply_text("❌ MCQ ফরম্যাট সঠিক নয় — 'Question' ও 'Ans/Correct Answer' থাকার কথা।")
             return
 
-        polls = self.parse_mcq_text(text)
+        await self._queue_mcq(u, c, uid, self.parse_mcq_text(text))
+
+    async def _queue_mcq(self, u, c, uid, polls, parts=1):
         if not polls:
             if u.message:
                 await u.message.reply_text("❌ পোল তৈরি হয়নি (পার্সিং ব্যর্থ)। অনুগ্রহ করে ফরম্যাট পরীক্ষা করুন।")
             return
 
+        queued = await self._preflight(u, polls, uid)
+        if not queued:
+            return
+
         # Append polls to queue (no modification of original messages)
-        for p in polls:
-            self.poll_queue.append({"owner_user_id": uid, "poll_data": p})
+        self.enqueue_polls(uid, queued)
 
-        total = len(polls)
-        batches = (total - 1) // POLLS_PER_BATCH + 1
-        est_seconds = total * DELAY_BETWEEN_POLLS + max(0, batches - 1) * BREAK_BETWEEN_BATCHES
-        est_min = est_seconds // 60
-        est_sec = est_seconds % 60
+        counts = {t: len(p) for t, p in queued.items()}
+        total = max(counts.values())
+        schedule = self.user_schedule.get(uid)
 
         if u.message:
             await u.message.reply_text(
                 f"📊 Processing your polls...\n"
-                f"✓ Found {total} polls.\n\n"
+                f"✓ Found {total} polls" + (f" in {parts} messages.\n\n" if parts > 1 else ".\n\n") +
                 f"Added to queue! 📦\n"
-                f"Will be sent in {batches} batch(es) of up to {POLLS_PER_BATCH} polls each\n"
-                f"⏱ Estimated time: ~{est_min} min {est_sec} sec\n"
-                f"Starting to send..."
+                f"{self.eta_line(counts, schedule)}"
+                + ("" if schedule else "\nStarting to send...")
             )
 
         # start processing
         await self.process_queue(c, uid)
 
+    def _assemble(self, u, c, uid, text):
+        """
+        Buffer one piece of a long paste. The job is queued once, by _assemble_later,
+        when no new piece arrived for ASSEMBLE_WINDOW seconds.
+        """
+        asm = self.assemblers.get(uid)
+        if asm is None:
+            asm = self.assemblers[uid] = MessageAssembler(self.parse_mcq_text)
+            self.assembler_tasks[uid] = asyncio.create_task(self._assemble_later(c, uid, asm))
+        asm.update = u
+        asm.feed(text)
+
+    async def _assemble_later(self, c, uid, asm):
+        try:
+            while True:
+                delay = asm.deadline - time.monotonic()
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            del self.assemblers[uid]
+            self.assembler_tasks.pop(uid, None)
+            await self._queue_mcq(asm.update, c, uid, asm.finish(), parts=asm.parts)
+        except Exception as e:
+            logger.error(f"assemble error: {e}")
+
+    async def _preflight(self, u, polls, uid):
+        """
+        Check Telegram limits at queue time and drop what each channel already has.
+        Returns channel -> polls to send there; one summary message for everything
+        rejected/truncated/duplicate.
+        """
+        targets = self.targets_for(uid)
+        if not targets:
+            if u.message:
+                await u.message.reply_text("❌ কোনো চ্যানেল সেট করা নেই। /setchannel ব্যবহার করুন।")
+            return {}
+
+        report = self.new_report()
+        queued = {}
+        for poll, fresh in self.fan_out(self.prepare_polls(polls, uid, report), targets, report):
+            for target in fresh:
+                queued.setdefault(target, []).append(poll)
+        summary = self.report_summary(report)
+        if summary and u.message:
+            await u.message.reply_text(summary)
+        return queued
+
+    async def handle_document(self, u: Update, c: ContextTypes.DEFAULT_TYPE):
+        """
+        .csv / .txt upload of any size. The import runs as a background task
+        (see _import_document), so /queue, /cancel and other users' updates are
+        handled while a big file is still being read.
+        """
+        uid = u.effective_user.id if u.effective_user else None
+        doc = u.message.document if u.message else None
+        if uid is None or not doc:
+            return
+
+        targets = self.targets_for(uid)
+        if not targets:
+            await u.message.reply_text("❌ কোনো চ্যানেল সেট করা নেই। /setchannel ব্যবহার করুন।")
+            return
+
+        task = asyncio.create_task(self._import_document(u, c, uid, doc, targets))
+        self.import_tasks.add(task)
+        task.add_done_callback(self.import_tasks.discard)
+
+    async def _import_document(self, u, c, uid, doc, targets):
+        """
+        The file is downloaded to a temp file and streamed row by row into the
+        queue db, so sending starts with the first batch instead of after the
+        whole file and memory stays bounded.
+        """
+        is_csv = (doc.file_name or "").lower().endswith(".csv")
+        fd, path = tempfile.mkstemp(suffix=".csv" if is_csv else ".txt")
+        os.close(fd)
+        try:
+            try:
+                tg_file = await c.bot.get_file(doc.file_id)
+                await tg_file.download_to_drive(path)
+            except Exception as e:
+                logger.error(f"handle_document download error: {e}")
+                await u.message.reply_text("❌ ফাইল ডাউনলোড করা যায়নি।")
+                return
+
+            with open(path, "r", encoding="utf-8-sig", errors="replace", newline="") as f:
+                if not is_csv:
+                    # a .txt may hold either CSV or MCQ text; decide from the first non-empty line
+                    first_line = next((line for line in f if line.strip()), "")
+                    f.seek(0)
+                    is_csv = self.looks_like_csv(first_line)
+                polls = self.iter_csv_polls(f) if is_csv else self.iter_mcq_polls(f)
+                report = self.new_report()
+                schedule = self.user_schedule.get(uid)
+                counts = await self.import_polls(c, uid, targets, self.prepare_polls(polls, uid, report), report)
+
+            if not counts:
+                return  # all /cancel'ed; the progress message already says so
+            summary = self.report_summary(report)
+            if summary:
+                await u.message.reply_text(summary)
+
+            total = max(counts.values())
+            if not total:
+                if not report["duplicates"]:
+                    await u.message.reply_text("❌ পোল তৈরি হয়নি (পার্সিং ব্যর্থ)। অনুগ্রহ করে ফরম্যাট পরীক্ষা করুন।")
+                return
+
+            await u.message.reply_text(f"📁 File imported!\n✓ Loaded {total} polls.\n{self.eta_line(counts, schedule)}")
+        except Exception as e:
+            logger.error(f"import error: {e}")
+        finally:
+            os.remove(path)
+
+    async def import_polls(self, ctx, uid, targets, polls, report):
+        """
+        Feed a poll iterator into one new job per target channel in batches of
+        IMPORT_BATCH_SIZE. Each job goes to its channel worker with its first poll,
+        so the workers send while we parse. Returns channel -> polls imported for
+        the jobs not /cancel'ed meanwhile.
+        """
+        group = self._new_group(uid)
+        schedule = self.take_schedule(uid)
+        jobs = {
+            target: self._new_job(
+                self.store.add_job(uid, target, schedule=schedule), uid, target, 0,
+                feeding=True, group=group, schedule=schedule
+            )
+            for target in targets
+        }
+        batches = {target: [] for target in targets}
+        # fan_out reads this list per poll, so a /cancel'ed channel stops claiming hashes
+        live = list(targets)
+        try:
+            for i, (poll, fresh) in enumerate(self.fan_out(polls, live, report), 1):
+                fed = False
+                for target in fresh:
+                    if jobs[target].cancelled:
+                        # /cancel arrived mid-import: stop feeding and free what this channel claimed
+                        for h in [poll.hash] + [p.hash for p in batches[target]]:
+                            self.store.forget_hash(target, h)
+                        batches[target] = []
+                        live.remove(target)
+                        continue
+                    job, batch = jobs[target], batches[target]
+                    batch.append(poll)
+                    if len(batch) >= IMPORT_BATCH_SIZE or job.total == 0:
+                        if job.total == 0:
+                            self._submit_job(ctx, job)
+                        self._feed_job(job, batch)
+                        batches[target] = []
+                        fed = True
+                if not live:
+                    break
+                if fed or i % IMPORT_BATCH_SIZE == 0:
+                    # let the workers (and other updates) run between batches,
+                    # also through long runs of duplicates that feed nothing
+                    await asyncio.sleep(0)
+            for target, batch in batches.items():
+                if batch and not jobs[target].cancelled:
+                    self._feed_job(jobs[target], batch)
+        finally:
+            for target, job in jobs.items():
+                job.feeding = False
+                self._wake(target)
+                if job.total == 0:
+                    self.store.finish_job(job.job_id)
+                    self._drop_job(job)
+        return {target: job.total for target, job in jobs.items() if not job.cancelled}
+
+    def _feed_job(self, job, batch):
+        self.store.add_polls(job.job_id, job.total, batch)
+        job.total += len(batch)
+        self._wake(job.target)
+
     # ---------------------- Setup ----------------------
     async def error_handler(self, update: object, context: ContextTypes.DEFAULT_TYPE):
         # central error handler so Telegram exceptions don't crash your bot
@@ -732,20 +2363,110 @@ Question,Option1,Option2,Option3,Option4,Option5,Answer,Explanation
         self.app.add_handler(CommandHandler("start", self.start))
         self.app.add_handler(CommandHandler("setchannel", self.setchannel))
         self.app.add_handler(CommandHandler("setformat", self.setformat))
+        self.app.add_handler(CommandHandler("stats", self.stats))
+        self.app.add_handler(CommandHandler("setweight", self.setweight))
+        self.app.add_handler(CommandHandler("schedule", self.schedule))
+        self.app.add_handler(CommandHandler("queue", self.queue))
+        self.app.add_handler(CommandHandler("pause", self.pause))
+        self.app.add_handler(CommandHandler("resume", self.resume))
+        self.app.add_handler(CommandHandler("cancel", self.cancel))
 
         self.app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_text))
+        self.app.add_handler(MessageHandler(
+            filters.Document.FileExtension("csv") | filters.Document.FileExtension("txt"),
+            self.handle_document
+        ))
 
         # global error handler
         self.app.add_error_handler(self.error_handler)
 
+    async def _on_startup(self, app):
+        self._saver = asyncio.create_task(self._save_loop())
+        self._metrics_writer = asyncio.create_task(self._metrics_loop())
+        # the Application has a .bot, so it can stand in for the handler context
+        self._timer_task = asyncio.create_task(self.timers.run())
+        for job_id, uid, target, pending, schedule, paused in self.resumed_jobs:
+            self._submit_job(app, self._new_job(job_id, uid, target, pending, resumed=True, schedule=schedule,
+                                                paused=paused))
+        self.resumed_jobs = []
+
+    async def _on_stop(self, app):
+        """
+        post_stop: runs after the updater and the application stopped but before
+        bot.shutdown(), so the workers can still finish the poll in flight and the
+        pending original_polls.txt uploads can still go out.
+        """
+        for task in self.assembler_tasks.values():
+            task.cancel()
+        # stop imports first: their cleanup still needs the workers' queues and the store
+        for task in self.import_tasks:
+            task.cancel()
+        if self.import_tasks:
+            await asyncio.wait(self.import_tasks, timeout=WORKER_SHUTDOWN_WAIT)
+
+        # channel workers wait forever for new jobs: tell them to stop, then cancel stragglers
+        self._stop.set()
+        for sched in self.channel_queues.values():
+            sched.changed.set()
+        workers = list(self.channel_workers.values())
+        if workers:
+            _, pending = await asyncio.wait(workers, timeout=WORKER_SHUTDOWN_WAIT)
+            for worker in pending:
+                worker.cancel()
+            if pending:
+                _, stuck = await asyncio.wait(pending, timeout=WORKER_SHUTDOWN_WAIT)
+                if stuck:
+                    logger.error(f"{len(stuck)} channel worker(s) did not stop")
+        self.channel_workers.clear()
+
+        # the truncated polls are already out, so don't lose their full text
+        for job in self.jobs.values():
+            self._flush_fallback(app, job)
+        if self.fallback_tasks:
+            await asyncio.wait(self.fallback_tasks, timeout=FALLBACK_SHUTDOWN_WAIT)
+
+    async def _on_shutdown(self, app):
+        self.store.close()
+
+        tasks = [t for t in (self._saver, self._metrics_writer, self._timer_task) if t]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._flush_data()
+
     # ---------------------- Run ----------------------
     def run(self):
         print("Bot is running...")
         self.app.run_polling()
 
+    def run_webhook(self, listen=WEBHOOK_LISTEN, port=WEBHOOK_PORT, path=WEBHOOK_PATH,
+                    secret=WEBHOOK_SECRET, url=WEBHOOK_URL):
+        # PTB's own server (pip install "python-telegram-bot[webhooks]"); it calls setWebhook on startup
+        print("Bot is running (webhook)...")
+        self.app.run_webhook(
+            listen=listen, port=port, url_path=path.lstrip("/"), secret_token=secret or None,
+            webhook_url=url.rstrip("/") + path, allowed_updates=Update.ALL_TYPES
+        )
+
 
 def main():
-    PollBot(BOT_TOKEN).run()
+    ap = argparse.ArgumentParser(description="ALIF Poll Bot")
+    ap.add_argument("--webhook", action="store_true", help="serve updates over HTTP instead of polling")
+    ap.add_argument("--listen", default=WEBHOOK_LISTEN, help="address to bind in webhook mode")
+    ap.add_argument("--port", type=int, default=WEBHOOK_PORT)
+    ap.add_argument("--path", default=WEBHOOK_PATH, help="URL path updates are POSTed to")
+    ap.add_argument("--secret", default=WEBHOOK_SECRET, help="expected X-Telegram-Bot-Api-Secret-Token")
+    ap.add_argument("--url", default=WEBHOOK_URL, help="public base URL to register with setWebhook")
+    ap.add_argument("--base-url", help="another Bot API server, e.g. http://127.0.0.1:8081/bot (../bot_loadtest)")
+    args = ap.parse_args()
+    if args.webhook and not args.url:
+        ap.error("--webhook needs --url, the public https base URL Telegram posts to")
+
+    bot = PollBot(BOT_TOKEN, base_url=args.base_url)
+    if args.webhook:
+        bot.run_webhook(listen=args.listen, port=args.port, path=args.path, secret=args.secret, url=args.url)
+    else:
+        bot.run()
 
 
 if __name__ == "__main__":
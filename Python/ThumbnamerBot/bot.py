@@ -1,6 +1,18 @@
 import os
+import re
 import json
+import time
+import sqlite3
+import asyncio
+import argparse
+import contextlib
+from io import BytesIO
+from collections import OrderedDict
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputFile
+try:
+    from PIL import Image  # ঐচ্ছিক: pip install pillow — থাম্বনেইল resize/recompress এর জন্য
+except ImportError:
+    Image = None
 from telegram.ext import (
     ApplicationBuilder,
     CommandHandler,
@@ -12,56 +24,356 @@ from telegram.ext import (
 
 # ============================
 TOKEN = "8418888891:AAEJ8EcVeh6N6TJkFX8J0bLKmBBnRdcLIng"
-DATA_FILE = "user_data.json"
+DATA_FILE = "user_data.json"  # পুরোনো JSON স্টোর; প্রথম চালুতে DB_FILE এ import হয়
+DB_FILE = "user_data.db"
+USER_CACHE_SIZE = 1000  # এতগুলো hot ইউজার রেকর্ড মেমরিতে থাকে (LRU)
 DOWNLOAD_DIR = "downloads"
+# ডাউনলোড করা PDF/থাম্বনেইল এর ক্যাশ, Telegram file_unique_id দিয়ে চেনা হয়
+CACHE_DIR = os.path.join(DOWNLOAD_DIR, "cache")
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+CACHE_TTL = 24 * 3600  # এতক্ষণ ব্যবহার না হলে ফাইল মুছে যায়
+CACHE_MIN_AGE = 60     # সদ্য ব্যবহৃত ফাইল হয়তো এখনো send_document এর পথে, তাই quota ছাড়ালেও রাখা হয়
+INMEMORY_MAX_BYTES = 1024 * 1024  # এর চেয়ে ছোট ফাইল disk থেকে একবারে মেমরিতে পড়ে পাঠানো হয়
+# Telegram শুধু ছোট JPEG থাম্বনেইল নেয়
+THUMB_MAX_SIDE = 320
+THUMB_MAX_BYTES = 200 * 1024
+THUMB_QUALITIES = (85, 75, 60, 45, 30)
 
-os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+# webhook mode (python bot.py --webhook)
+WEBHOOK_LISTEN = "0.0.0.0"
+WEBHOOK_PORT = 8444
+WEBHOOK_PATH = "/telegram"
+WEBHOOK_SECRET = ""   # checked against X-Telegram-Bot-Api-Secret-Token when set
+WEBHOOK_URL = ""      # public https base URL; setWebhook is called with it on startup
 
-# --- ডাটা হ্যান্ডলার ---
-def load_data():
-    if not os.path.exists(DATA_FILE):
-        return {}
-    try:
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        return {}
+os.makedirs(CACHE_DIR, exist_ok=True)
+# পুরোনো ভার্সনের {user_id}_original.pdf / {user_id}_thumb.jpg ফাইলগুলো আর লাগে না
+for _name in os.listdir(DOWNLOAD_DIR):
+    if _name.endswith(("_original.pdf", "_thumb.jpg")):
+        os.remove(os.path.join(DOWNLOAD_DIR, _name))
+
+# --- ইউজার স্টোর: SQLite (WAL), প্রতি ইভেন্টে শুধু ওই ইউজারের একটি row লেখা হয় ---
+USER_FIELDS = ("last_pdf_id", "last_pdf_unique_id", "custom_name", "thumbnail_file_id", "thumbnail_unique_id",
+               "awaiting_name", "awaiting_thumb")
+
+def new_record():
+    return {
+        "last_pdf_id": None,
+        "last_pdf_unique_id": None,
+        "custom_name": None,
+        "thumbnail_file_id": None,
+        "thumbnail_unique_id": None,
+        "awaiting_name": False,
+        "awaiting_thumb": False
+    }
+
+class UserStore:
+    """
+    One row per user, loaded on first use and kept in a bounded LRU, so the cost of
+    an event doesn't grow with the number of users. Updates are written through.
+    """
+
+    def __init__(self, path=DB_FILE, cache_size=USER_CACHE_SIZE):
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                user_id INTEGER PRIMARY KEY,
+                last_pdf_id TEXT,
+                custom_name TEXT,
+                thumbnail_file_id TEXT,
+                awaiting_name INTEGER NOT NULL DEFAULT 0,
+                awaiting_thumb INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        # file_unique_id কলাম দুটো পরে এসেছে; পুরোনো DB তে যোগ করা হয়
+        columns = [r[1] for r in self.db.execute("PRAGMA table_info(users)")]
+        for name in ("last_pdf_unique_id", "thumbnail_unique_id"):
+            if name not in columns:
+                self.db.execute(f"ALTER TABLE users ADD COLUMN {name} TEXT")
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+
+    def get(self, user_id):
+        rec = self.cache.get(user_id)
+        if rec is not None:
+            self.cache.move_to_end(user_id)
+            return rec
+        row = self.db.execute(
+            f"SELECT {', '.join(USER_FIELDS)} FROM users WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        rec = new_record()
+        if row:
+            rec.update(zip(USER_FIELDS, row))
+            rec["awaiting_name"] = bool(rec["awaiting_name"])
+            rec["awaiting_thumb"] = bool(rec["awaiting_thumb"])
+        self.cache[user_id] = rec
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return rec
 
-def save_data(data):
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    def update(self, user_id, **fields):
+        rec = self.get(user_id)
+        rec.update(fields)
+        cols = [c for c in fields if c in USER_FIELDS]
+        with self.db:
+            self.db.execute(
+                f"INSERT INTO users (user_id, {', '.join(cols)}) VALUES (?{', ?' * len(cols)}) "
+                f"ON CONFLICT(user_id) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in cols)}",
+                (user_id, *(fields[c] for c in cols))
+            )
+        return rec
 
-data_store = load_data()
+    def import_json(self, path):
+        # পুরোনো user_data.json একবারেই DB তে তোলা হয়, তারপর .migrated নামে রেখে দেওয়া হয়
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return 0
+        rows = []
+        for key, rec in data.items():
+            rec = dict(new_record(), **rec)
+            rows.append((int(key), *(rec[c] for c in USER_FIELDS)))
+        with self.db:
+            self.db.executemany(
+                f"INSERT OR IGNORE INTO users (user_id, {', '.join(USER_FIELDS)}) VALUES (?{', ?' * len(USER_FIELDS)})",
+                rows
+            )
+        os.replace(path, path + ".migrated")
+        return len(rows)
+
+    def close(self):
+        self.db.close()
+
+store = UserStore()
+if os.path.exists(DATA_FILE):
+    store.import_json(DATA_FILE)
+
+async def on_shutdown(app):
+    store.close()
 
 def get_user_record(user_id):
-    key = str(user_id)
-    if key not in data_store:
-        data_store[key] = {
-            "last_pdf_id": None,
-            "custom_name": None,
-            "thumbnail_file_id": None,
-            "awaiting_name": False,
-            "awaiting_thumb": False
-        }
-    return data_store[key]
+    return store.get(user_id)
 
-def set_user_thumbnail(user_id, file_id):
-    rec = get_user_record(user_id)
-    rec["thumbnail_file_id"] = file_id
-    rec["awaiting_thumb"] = False
-    save_data(data_store)
+def set_user_thumbnail(user_id, file_id, unique_id=None):
+    store.update(user_id, thumbnail_file_id=file_id, thumbnail_unique_id=unique_id, awaiting_thumb=False)
 
 def set_user_custom_name(user_id, filename):
-    rec = get_user_record(user_id)
-    rec["custom_name"] = filename
-    rec["awaiting_name"] = False
-    save_data(data_store)
-    return rec
+    return store.update(user_id, custom_name=filename, awaiting_name=False)
 
-def set_last_pdf(user_id, file_id):
-    rec = get_user_record(user_id)
-    rec["last_pdf_id"] = file_id
-    save_data(data_store)
+def set_last_pdf(user_id, file_id, unique_id=None):
+    store.update(user_id, last_pdf_id=file_id, last_pdf_unique_id=unique_id)
+
+# --- ফাইল ক্যাশ: একই PDF/ছবি বারবার ডাউনলোড না করে ডিস্ক থেকে ---
+class FileCache:
+    """
+    Downloaded Telegram files on disk, named by file_unique_id (the same for every
+    copy of a file, and its content never changes). Least recently used files go
+    first once the cache is over max_bytes; files unused for ttl seconds are dropped.
+    The last use is kept in the file's mtime, so the order survives restarts.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()   # unique_id -> (size, last used), oldest first
+        self.total = 0
+        self.pending = {}              # unique_id -> download in progress
+        self.hits = 0
+        self.misses = 0
+        found = []
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            if name.endswith(".part"):
+                os.remove(path)   # আগের বার মাঝপথে থেমে যাওয়া ডাউনলোড
+                continue
+            st = os.stat(path)
+            found.append((st.st_mtime, name, st.st_size))
+        for mtime, name, size in sorted(found):
+            self.entries[name] = (size, mtime)
+            self.total += size
+        self.evict()
+
+    @staticmethod
+    def key(unique_id):
+        # file_unique_id is URL-safe base64 already; just make sure it is a plain file name
+        return re.sub(r"[^\w-]", "_", unique_id)
+
+    def path(self, unique_id):
+        return os.path.join(self.root, unique_id)
+
+    def get(self, unique_id):
+        entry = self.entries.get(unique_id)
+        if entry is None:
+            return None
+        now = time.time()
+        path = self.path(unique_id)
+        if now - entry[1] > self.ttl or not os.path.exists(path):
+            self._remove(unique_id)
+            return None
+        self.entries[unique_id] = (entry[0], now)
+        self.entries.move_to_end(unique_id)
+        os.utime(path, (now, now))
+        return path
+
+    async def fetch(self, bot, file_id, unique_id=None):
+        """Local path of the file, downloaded only if it isn't cached yet."""
+        tg_file = None
+        if unique_id is None:
+            # পুরোনো রেকর্ডে unique id নেই; getFile থেকে জেনে নেওয়া
+            tg_file = await bot.get_file(file_id)
+            unique_id = tg_file.file_unique_id
+        unique_id = self.key(unique_id)
+        path = self.get(unique_id)
+        if path:
+            self.hits += 1
+            return path
+        # একই ফাইল একসাথে দুবার চাইলে একটাই ডাউনলোড
+        task = self.pending.get(unique_id)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._download(bot, file_id, unique_id, tg_file))
+            self.pending[unique_id] = task
+            task.add_done_callback(lambda _: self.pending.pop(unique_id, None))
+        return await asyncio.shield(task)
+
+    async def _download(self, bot, file_id, unique_id, tg_file):
+        if tg_file is None:
+            tg_file = await bot.get_file(file_id)
+        path = self.path(unique_id)
+        tmp = f"{path}.{id(tg_file)}.part"
+        try:
+            await tg_file.download_to_drive(tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return self._added(unique_id)
+
+    def put(self, key, data):
+        # bytes made by the bot itself (processed thumbnails)
+        path = self.path(key)
+        tmp = f"{path}.{id(data)}.part"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return self._added(key)
+
+    def _added(self, key):
+        if key in self.entries:
+            self.total -= self.entries[key][0]
+        size = os.path.getsize(self.path(key))
+        self.entries[key] = (size, time.time())
+        self.entries.move_to_end(key)
+        self.total += size
+        self.evict(keep=key)
+        return self.path(key)
+
+    def evict(self, keep=None):
+        now = time.time()
+        for unique_id, (size, used) in list(self.entries.items()):
+            if unique_id == keep:
+                continue
+            if now - used < CACHE_MIN_AGE or (self.total <= self.max_bytes and now - used <= self.ttl):
+                break
+            self._remove(unique_id)
+
+    def _remove(self, unique_id):
+        size, _ = self.entries.pop(unique_id)
+        self.total -= size
+        try:
+            os.remove(self.path(unique_id))
+        except FileNotFoundError:
+            pass
+
+file_cache = FileCache()
+
+# --- থাম্বনেইল: একবার ছোট JPEG বানিয়ে ক্যাশে, পরের সব PDF এ সেটাই ---
+def pick_thumbnail_size(photo_sizes):
+    """The PhotoSize to download (Telegram lists them smallest first)."""
+    if Image is None:
+        # resize করা যাবে না: যেটা আগে থেকেই সীমার মধ্যে তার মধ্যে সবচেয়ে বড়টা
+        fitting = [p for p in photo_sizes
+                   if max(p.width, p.height) <= THUMB_MAX_SIDE and (p.file_size or 0) <= THUMB_MAX_BYTES]
+        return fitting[-1] if fitting else photo_sizes[0]
+    # সবচেয়ে ছোট যেটা থেকে পুরো 320px থাম্বনেইল হয়
+    for p in photo_sizes:
+        if max(p.width, p.height) >= THUMB_MAX_SIDE:
+            return p
+    return photo_sizes[-1]
+
+def make_thumbnail(path):
+    """JPEG bytes within Telegram's thumbnail limits, or None if the file is fine as it is."""
+    if Image is None:
+        return None
+    with Image.open(path) as im:
+        if im.format == "JPEG" and max(im.size) <= THUMB_MAX_SIDE and os.path.getsize(path) <= THUMB_MAX_BYTES:
+            return None
+        im = im.convert("RGB")
+        im.thumbnail((THUMB_MAX_SIDE, THUMB_MAX_SIDE))
+        for quality in THUMB_QUALITIES:
+            buf = BytesIO()
+            im.save(buf, "JPEG", quality=quality, optimize=True)
+            if buf.tell() <= THUMB_MAX_BYTES:
+                break
+        return buf.getvalue()
+
+async def prepare_thumbnail(bot, file_id, unique_id=None):
+    """Path of the Telegram-ready thumbnail for this photo; processed once, then served from file_cache."""
+    if unique_id is None:
+        unique_id = (await bot.get_file(file_id)).file_unique_id
+    key = "thumb_" + file_cache.key(unique_id)
+    path = file_cache.get(key)
+    if path:
+        file_cache.hits += 1
+        return path
+    # একই ছবি একসাথে কয়েকজন পাঠালে একবারই process হয়
+    task = file_cache.pending.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_process_thumbnail(bot, file_id, unique_id, key))
+        file_cache.pending[key] = task
+        task.add_done_callback(lambda _: file_cache.pending.pop(key, None))
+    return await asyncio.shield(task)
+
+async def _process_thumbnail(bot, file_id, unique_id, key):
+    # আসল ছবিটা cache এ থেকে যায়; অন্য কেউ হয়তো এখনো পড়ছে, LRU/TTL পরে সরাবে
+    src = await file_cache.fetch(bot, file_id, unique_id)
+    try:
+        # Pillow CPU-bound, তাই worker thread এ
+        data = await asyncio.to_thread(make_thumbnail, src)
+    except Exception as e:
+        print(f"thumbnail error: {e}")
+        return src
+    if data is None:
+        return src
+    return file_cache.put(key, data)
+
+# --- একই ইউজারের আপডেট একটার পর একটা; আলাদা ইউজারেরা একসাথে চলে (concurrent_updates) ---
+_user_locks = {}  # user_id -> [Lock, অপেক্ষমাণ + চলমান handler সংখ্যা]
+
+@contextlib.asynccontextmanager
+async def user_lock(user_id):
+    entry = _user_locks.setdefault(user_id, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if not entry[1]:
+            del _user_locks[user_id]
+
+def per_user(handler):
+    async def wrapped(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if update.effective_user is None:
+            return await handler(update, context)
+        async with user_lock(update.effective_user.id):
+            return await handler(update, context)
+    return wrapped
 
 # --- হ্যান্ডলারস ---
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -70,6 +382,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "PDF পাঠান → তারপর নাম বা থাম্বনেইল পরিবর্তন করতে পারবেন।"
     )
 
+@per_user
 async def document_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     doc = update.message.document
     if not doc:
@@ -79,7 +392,7 @@ async def document_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     user_id = update.effective_user.id
-    set_last_pdf(user_id, doc.file_id)
+    set_last_pdf(user_id, doc.file_id, doc.file_unique_id)
 
     keyboard = [
         [InlineKeyboardButton("নাম পরিবর্তন করো ✏️", callback_data="rename")],
@@ -88,49 +401,48 @@ async def document_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     reply_markup = InlineKeyboardMarkup(keyboard)
     await update.message.reply_text("আপনি কি এই PDF এর নাম বা থাম্বনেইল পরিবর্তন করতে চান?", reply_markup=reply_markup)
 
+@per_user
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
     user_id = query.from_user.id
-    rec = get_user_record(user_id)
 
     if query.data == "rename":
-        rec["awaiting_name"] = True
-        save_data(data_store)
+        store.update(user_id, awaiting_name=True)
         await query.message.reply_text("নতুন PDF নাম পাঠান:")
 
     elif query.data == "thumbnail":
-        rec["awaiting_thumb"] = True
-        save_data(data_store)
+        store.update(user_id, awaiting_thumb=True)
         await query.message.reply_text("নতুন থাম্বনেইল ছবি পাঠান:")
 
 # --- PDF পাঠানোর ফাংশন ---
+def open_upload(stack, path):
+    # ছোট ফাইল মেমরিতে, বড়টা খোলা file handle হিসেবে
+    if os.path.getsize(path) <= INMEMORY_MAX_BYTES:
+        with open(path, "rb") as f:
+            return f.read()
+    return stack.enter_context(open(path, "rb"))
+
 async def send_updated_pdf(update: Update, context: ContextTypes.DEFAULT_TYPE, rec):
     if not rec.get("last_pdf_id"):
         return
 
-    user_id = update.effective_user.id
-    pdf_file_id = rec["last_pdf_id"]
-    pdf_file = await context.bot.get_file(pdf_file_id)
-    pdf_path = os.path.join(DOWNLOAD_DIR, f"{user_id}_original.pdf")
-    await pdf_file.download_to_drive(pdf_path)
-
-    thumbnail_path = None
+    # PDF আর থাম্বনেইল একসাথে আনা হয় (ক্যাশে থাকলে ডাউনলোডই লাগে না)
+    fetches = [file_cache.fetch(context.bot, rec["last_pdf_id"], rec.get("last_pdf_unique_id"))]
     if rec.get("thumbnail_file_id"):
-        thumb_file = await context.bot.get_file(rec["thumbnail_file_id"])
-        thumbnail_path = os.path.join(DOWNLOAD_DIR, f"{user_id}_thumb.jpg")
-        await thumb_file.download_to_drive(thumbnail_path)
-
-    # ✅ এখানে 'with' ব্লক ঠিকভাবে ব্যবহার
-    with open(pdf_path, "rb") as f:
-        kwargs = {"chat_id": update.effective_chat.id, "document": InputFile(f, filename=rec.get("custom_name") or "Updated.pdf")}
-        if thumbnail_path:
-            with open(thumbnail_path, "rb") as t:
-                kwargs["thumbnail"] = InputFile(t)
-                await context.bot.send_document(**kwargs)
-        else:
-            await context.bot.send_document(**kwargs)
+        fetches.append(prepare_thumbnail(context.bot, rec["thumbnail_file_id"], rec.get("thumbnail_unique_id")))
+    paths = await asyncio.gather(*fetches)
+
+    with contextlib.ExitStack() as stack:
+        kwargs = {
+            "chat_id": update.effective_chat.id,
+            "document": InputFile(open_upload(stack, paths[0]), filename=rec.get("custom_name") or "Updated.pdf"),
+        }
+        if len(paths) > 1:
+            kwargs["thumbnail"] = InputFile(open_upload(stack, paths[1]), filename="thumb.jpg")
+        await context.bot.send_document(**kwargs)
 
+@per_user
 async def text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     rec = get_user_record(user_id)
@@ -145,6 +457,7 @@ async def text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await send_updated_pdf(update, context, rec)
         await update.message.reply_text("আপডেটকৃত PDF পাঠানো হয়েছে।")
 
+@per_user
 async def photo_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     rec = get_user_record(user_id)
@@ -152,22 +465,51 @@ async def photo_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if rec.get("awaiting_thumb"):
         photo_sizes = update.message.photo
         if photo_sizes:
-            file_id = photo_sizes[-1].file_id
-            set_user_thumbnail(user_id, file_id)
+            photo = pick_thumbnail_size(photo_sizes)
+            set_user_thumbnail(user_id, photo.file_id, photo.file_unique_id)
             await update.message.reply_text("থাম্বনেইল সংরক্ষিত হয়েছে।")
 
             await send_updated_pdf(update, context, rec)
             await update.message.reply_text("আপডেটকৃত PDF আপনার থাম্বনেইল সহ পাঠানো হয়েছে।")
 
 # --- Main ---
-def main():
-    app = ApplicationBuilder().token(TOKEN).build()
+def build_app(token=TOKEN, base_url=None, base_file_url=None):
+    builder = ApplicationBuilder().token(token).post_shutdown(on_shutdown).concurrent_updates(True)
+    if base_url:
+        # অন্য Bot API server, যেমন ../bot_loadtest এর local fake server
+        builder.base_url(base_url).base_file_url(base_file_url or base_url.replace("/bot", "/file/bot"))
+    app = builder.build()
 
     app.add_handler(CommandHandler("start", start))
     app.add_handler(MessageHandler(filters.Document.ALL, document_handler))
     app.add_handler(CallbackQueryHandler(button_handler))
     app.add_handler(MessageHandler(filters.TEXT & (~filters.COMMAND), text_handler))
     app.add_handler(MessageHandler(filters.PHOTO, photo_handler))
+    return app
+
+def main():
+    ap = argparse.ArgumentParser(description="ThumbNamerBot")
+    ap.add_argument("--webhook", action="store_true", help="serve updates over HTTP instead of polling")
+    ap.add_argument("--listen", default=WEBHOOK_LISTEN, help="address to bind in webhook mode")
+    ap.add_argument("--port", type=int, default=WEBHOOK_PORT)
+    ap.add_argument("--path", default=WEBHOOK_PATH, help="URL path updates are POSTed to")
+    ap.add_argument("--secret", default=WEBHOOK_SECRET, help="expected X-Telegram-Bot-Api-Secret-Token")
+    ap.add_argument("--url", default=WEBHOOK_URL, help="public base URL to register with setWebhook")
+    ap.add_argument("--base-url", help="another Bot API server, e.g. http://127.0.0.1:8081/bot (../bot_loadtest)")
+    args = ap.parse_args()
+    if args.webhook and not args.url:
+        ap.error("--webhook needs --url, the public https base URL Telegram posts to")
+
+    app = build_app(base_url=args.base_url)
+    if args.webhook:
+        # PTB এর নিজস্ব server (pip install "python-telegram-bot[webhooks]"); চালুর সময় setWebhook করে
+        print("🤖 Bot webhook started...")
+        app.run_webhook(
+            listen=args.listen, port=args.port, url_path=args.path.lstrip("/"),
+            secret_token=args.secret or None, webhook_url=args.url.rstrip("/") + args.path,
+            allowed_updates=Update.ALL_TYPES,
+        )
+        return
 
     print("🤖 Bot polling started...")
     app.run_polling()
@@ -0,0 +1,311 @@
+"""
+End-to-end throughput benchmark: PollBot and ThumbnamerBot against fake_bot_api.
+
+Both bots run unmodified in this process, long polling the local fake Bot API
+server. The harness plays many users at once:
+ - poll:  every user sets a channel and pastes an MCQ batch; reports polls/sec,
+          upload -> first poll / upload -> done latency and the bot's own
+          send_single_poll latency
+ - thumb: every user uploads PDFs and renames them (or sets a thumbnail) --edits
+          times each; reports PDFs/sec, rename -> PDF received latency and
+          how many files the bot downloaded
+
+Usage:
+  python bench_e2e.py                                  # both bots, default load
+  python bench_e2e.py --bots poll --users 50 --polls 40 --channels 10
+  python bench_e2e.py --bots thumb --users 20 --pdfs 5 --pdf-kb 2048 --thumb
+  python bench_e2e.py --bots thumb --pdfs 2 --edits 5
+  python bench_e2e.py --p429 0.02 --retry-after 1 --p400 0.01 --latency-ms 30
+  python bench_e2e.py --save run.json
+
+Bot state (settings, queue db, downloads) goes to a fresh temp directory,
+removed afterwards unless --keep is given.
+"""
+import argparse
+import asyncio
+import importlib
+import io
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from fake_bot_api import FakeBotAPI
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "Poll_Bot"))
+sys.path.insert(0, os.path.join(HERE, "..", "ThumbnamerBot"))
+
+TOKEN = "123456:FAKE-TOKEN"
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def latency_summary(values):
+    return {"p50": percentile(values, 0.5), "p90": percentile(values, 0.9), "p99": percentile(values, 0.99),
+            "max": max(values, default=0.0)}
+
+
+def mcq_text(uid, n):
+    out = []
+    for i in range(n):
+        out.append(
+            f"Question {i + 1}:\nu{uid}-{i}: which of these is the bench answer?\n"
+            f"A. alpha {i}\nB. beta {i}\nC. gamma {i}\nD. delta {i}\n"
+            f"Correct Answer: {'ABCD'[i % 4]}\nExplanation: generated for user {uid}\n\n"
+        )
+    return "".join(out)
+
+
+async def start_app(app):
+    # what run_polling does, minus the signal handling / blocking
+    await app.initialize()
+    if app.post_init:
+        await app.post_init(app)
+    await app.start()
+    await app.updater.start_polling(poll_interval=0, timeout=1)
+
+
+async def stop_app(app):
+    await app.updater.stop()
+    await app.stop()
+    if app.post_stop:
+        await app.post_stop(app)
+    await app.shutdown()
+    if app.post_shutdown:
+        await app.post_shutdown(app)
+
+
+def photo_bytes(side, kb):
+    # a real JPEG when Pillow is there (the bot may resize it), random bytes of about that size otherwise
+    try:
+        from PIL import Image
+    except ImportError:
+        return os.urandom(kb * 1024)
+    buf = io.BytesIO()
+    Image.effect_noise((side, side), 64).convert("RGB").save(buf, "JPEG", quality=90)
+    return buf.getvalue()
+
+
+def new_api(args):
+    return FakeBotAPI(p429=args.p429, retry_after=args.retry_after, p400=args.p400,
+                      latency=args.latency_ms / 1000)
+
+
+# ---------------------- PollBot ----------------------
+async def bench_poll(args):
+    poll = importlib.import_module("poll")
+    api = await new_api(args).start()
+    bot = poll.PollBot(TOKEN, base_url=api.base_url, base_file_url=api.base_file_url)
+    bot.rate_limiter = poll.RateLimiter(args.global_rate, args.chat_rate)
+    await start_app(bot.app)
+
+    users = [1000 + i for i in range(args.users)]
+    t0 = time.monotonic()
+    pushed = {}
+    for uid in users:
+        api.push_message(uid, f"/setchannel @bench{uid % args.channels}")
+        api.push_message(uid, mcq_text(uid, args.polls))
+        pushed[uid] = time.monotonic()
+
+    def done_at():
+        done = {}
+        for t, method, chat, params in api.sent:
+            if method == "sendMessage" and params.get("text", "").startswith("✅ All done"):
+                done.setdefault(int(chat), t)
+        return done
+
+    finished = await api.wait_until(lambda: len(done_at()) == len(users), args.timeout)
+    elapsed = time.monotonic() - t0
+
+    first_poll = {}
+    last_poll = t0
+    for t, method, chat, params in api.sent:
+        if method == "sendPoll":
+            uid = int(params["question"].split(":", 1)[0].split("-", 1)[0].lstrip("u"))
+            first_poll.setdefault(uid, t)
+            last_poll = t
+    done = done_at()
+    send = bot.metrics.histograms.get("send_poll_seconds")
+    polls_sent = api.count("sendPoll")
+
+    await stop_app(bot.app)
+    await api.close()
+    return {
+        "bot": "poll",
+        "finished": finished,
+        "users": len(users),
+        "channels": args.channels,
+        "polls_expected": len(users) * args.polls,
+        "polls_sent": polls_sent,
+        "seconds": elapsed,
+        "polls_per_sec": polls_sent / (last_poll - t0) if last_poll > t0 else 0.0,
+        "first_poll_latency": latency_summary([first_poll[u] - pushed[u] for u in first_poll]),
+        "done_latency": latency_summary([done[u] - pushed[u] for u in done]),
+        "send_single_poll_p50": send.quantile(0.5) if send else 0.0,
+        "send_single_poll_p95": send.quantile(0.95) if send else 0.0,
+        "faults": {f"{m} {c}": n for (m, c), n in api.faults.items()},
+    }
+
+
+# ---------------------- ThumbnamerBot ----------------------
+async def bench_thumb(args):
+    tb = importlib.import_module("bot")
+    api = await new_api(args).start()
+    app = tb.build_app(TOKEN, base_url=api.base_url, base_file_url=api.base_file_url)
+    await start_app(app)
+
+    pdf = b"%PDF-1.4\n" + os.urandom(args.pdf_kb * 1024)
+    photo = [(side, side, photo_bytes(side, kb)) for side, kb in ((90, 3), (320, 25), (1280, 300))]
+    users = [2000 + i for i in range(args.users)]
+    t0 = time.monotonic()
+    pushed = {uid: [] for uid in users}
+    for i in range(args.pdfs):
+        for uid in users:
+            api.push_document(uid, pdf, f"doc{i}.pdf")
+            for e in range(args.edits):
+                if args.thumb:
+                    api.push_callback(uid, "thumbnail")
+                    api.push_photo(uid, photo)
+                else:
+                    api.push_callback(uid, "rename")
+                    api.push_message(uid, f"renamed_{uid}_{i}_{e}")
+                pushed[uid].append(time.monotonic())
+
+    expected = len(users) * args.pdfs * args.edits
+
+    def settled():
+        return api.count("sendDocument") + api.faults.get(("sendDocument", 429), 0) \
+            + api.faults.get(("sendDocument", 400), 0) >= expected
+
+    finished = await api.wait_until(settled, args.timeout)
+    elapsed = time.monotonic() - t0
+
+    latencies = []
+    thumb_bytes = 0
+    last_pdf = t0
+    seen = {uid: 0 for uid in users}
+    for t, method, chat, params in api.sent:
+        if method == "sendDocument":
+            thumb_bytes += params.get("_thumbnail_bytes", 0)
+            uid = int(chat)
+            if seen[uid] < len(pushed[uid]):
+                latencies.append(t - pushed[uid][seen[uid]])
+            seen[uid] += 1
+            last_pdf = t
+    pdfs_sent = api.count("sendDocument")
+    cache = tb.file_cache
+
+    await stop_app(app)
+    await api.close()
+    return {
+        "bot": "thumb",
+        "finished": finished,
+        "users": len(users),
+        "pdfs_expected": expected,
+        "pdfs_sent": pdfs_sent,
+        "pdf_kb": args.pdf_kb,
+        "thumb": args.thumb,
+        "seconds": elapsed,
+        "pdfs_per_sec": pdfs_sent / (last_pdf - t0) if last_pdf > t0 else 0.0,
+        "pdf_latency": latency_summary(latencies),
+        "file_downloads": api.file_downloads,
+        "cache_hits": cache.hits,
+        "thumb_kb_per_pdf": thumb_bytes / 1024 / pdfs_sent if pdfs_sent else 0.0,
+        "faults": {f"{m} {c}": n for (m, c), n in api.faults.items()},
+    }
+
+
+def print_result(r):
+    def lat(name, s):
+        return f"  {name:<24} p50 {s['p50']:.3f}s  p90 {s['p90']:.3f}s  p99 {s['p99']:.3f}s  max {s['max']:.3f}s"
+
+    state = "" if r["finished"] else "  (TIMED OUT)"
+    if r["bot"] == "poll":
+        print(f"PollBot: {r['users']} users -> {r['channels']} channels, "
+              f"{r['polls_sent']}/{r['polls_expected']} polls in {r['seconds']:.2f}s{state}")
+        print(f"  polls/sec                {r['polls_per_sec']:.1f}")
+        print(lat("upload -> first poll", r["first_poll_latency"]))
+        print(lat("upload -> done", r["done_latency"]))
+        print(f"  send_single_poll         p50 ≤{r['send_single_poll_p50']:g}s  p95 ≤{r['send_single_poll_p95']:g}s")
+    else:
+        print(f"ThumbnamerBot: {r['users']} users, {r['pdfs_sent']}/{r['pdfs_expected']} PDFs "
+              f"({r['pdf_kb']} KB{', thumbnail' if r['thumb'] else ''}) in {r['seconds']:.2f}s{state}")
+        print(f"  PDFs/sec                 {r['pdfs_per_sec']:.1f}")
+        print(lat("request -> PDF", r["pdf_latency"]))
+        print(f"  file downloads           {r['file_downloads']} ({r['cache_hits']} served from the file cache)")
+        if r["thumb"]:
+            print(f"  thumbnail uploaded       {r['thumb_kb_per_pdf']:.1f} KB per PDF")
+    if r["faults"]:
+        print(f"  injected faults          {r['faults']}")
+
+
+async def run(args):
+    results = []
+    if "poll" in args.bots:
+        results.append(await bench_poll(args))
+        print_result(results[-1])
+    if "thumb" in args.bots:
+        results.append(await bench_thumb(args))
+        print_result(results[-1])
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--bots", default="poll,thumb", help="comma separated: poll, thumb")
+    ap.add_argument("--users", type=int, default=20)
+    ap.add_argument("--polls", type=int, default=30, help="polls per user (poll)")
+    ap.add_argument("--channels", type=int, default=5, help="channels the users are spread over (poll)")
+    ap.add_argument("--chat-rate", type=float, default=None, help="PollBot per-channel polls/sec (default: CHAT_RATE)")
+    ap.add_argument("--global-rate", type=float, default=None, help="PollBot global polls/sec (default: GLOBAL_RATE)")
+    ap.add_argument("--pdfs", type=int, default=3, help="PDFs per user (thumb)")
+    ap.add_argument("--pdf-kb", type=int, default=512, help="PDF size (thumb)")
+    ap.add_argument("--edits", type=int, default=1, help="renames / thumbnail changes per PDF (thumb)")
+    ap.add_argument("--thumb", action="store_true", help="set a thumbnail instead of renaming (thumb)")
+    ap.add_argument("--p429", type=float, default=0.0, help="share of sends answered with 429")
+    ap.add_argument("--retry-after", type=int, default=1)
+    ap.add_argument("--p400", type=float, default=0.0, help="share of sends answered with 400")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="fake Bot API response latency")
+    ap.add_argument("--timeout", type=float, default=600, help="give up after this many seconds per bot")
+    ap.add_argument("--save", help="write results as JSON")
+    ap.add_argument("--verbose", action="store_true", help="keep the bots' error logging")
+    ap.add_argument("--keep", action="store_true", help="keep the temp directory with the bots' state")
+    args = ap.parse_args()
+    args.bots = [b for b in args.bots.split(",") if b]
+    save = os.path.abspath(args.save) if args.save else None
+
+    # bots keep their state relative to the working directory
+    workdir = tempfile.mkdtemp(prefix="bot_loadtest_")
+    os.chdir(workdir)
+    if args.chat_rate is None or args.global_rate is None:
+        poll = importlib.import_module("poll")
+        args.chat_rate = args.chat_rate or poll.CHAT_RATE
+        args.global_rate = args.global_rate or poll.GLOBAL_RATE
+    if not args.verbose:
+        # injected faults would otherwise flood the console
+        logging.disable(logging.CRITICAL)
+
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        os.chdir(HERE)
+        if args.keep:
+            print(f"bot state kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    if save:
+        with open(save, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
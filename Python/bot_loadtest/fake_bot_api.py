@@ -0,0 +1,414 @@
+"""
+Local stand-in for the Telegram Bot API, for load-testing the bots without Telegram.
+
+Speaks enough of the HTTP Bot API for python-telegram-bot: getMe, getUpdates (long
+polling), sendMessage, editMessageText, sendPoll, sendDocument, getFile and file
+downloads, plus no-op answers for the housekeeping calls (deleteWebhook,
+answerCallbackQuery, ...). Point a bot at it with
+  base_url="http://127.0.0.1:<port>/bot", base_file_url="http://127.0.0.1:<port>/file/bot"
+
+Faults can be injected on the send methods: a share of requests answered with
+429 + retry_after, a share answered with 400, and a fixed response latency.
+
+The "user side" (push_message, push_document, push_callback, ...) queues updates
+for getUpdates, so a harness can play many users at once; see bench_e2e.py.
+Run on its own (python fake_bot_api.py --port 8081) it just serves and logs counts.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import zlib
+from urllib.parse import parse_qsl
+
+SEND_METHODS = ("sendMessage", "sendPoll", "sendDocument", "editMessageText")
+MAX_BODY = 64 << 20
+MAX_HEADERS = 100
+IDLE_TIMEOUT = 300     # seconds a keep-alive connection may sit between requests
+READ_TIMEOUT = 30      # seconds for the rest of a request once it started
+
+
+class FakeBotAPI:
+    def __init__(self, host="127.0.0.1", port=0, p429=0.0, retry_after=1, p400=0.0,
+                 latency=0.0, fault_methods=("sendPoll", "sendDocument"), seed=1):
+        self.host = host
+        self.port = port
+        self.p429 = p429
+        self.retry_after = retry_after
+        self.p400 = p400
+        self.latency = latency
+        self.fault_methods = set(fault_methods)
+        self.rng = random.Random(seed)
+
+        self.updates = []
+        self.next_update_id = 1
+        self.new_updates = asyncio.Event()
+        self.files = {}               # file_id -> (file_path, bytes)
+        self.next_message_id = {}     # chat_id -> last message_id
+        self.calls = {}               # method -> requests seen
+        self.faults = {}              # (method, code) -> injected errors
+        self.file_downloads = 0       # GET /file/bot<token>/... requests
+        # successful sends: (monotonic time, method, chat_id, params)
+        self.sent = []
+        self.changed = asyncio.Event()
+        self.server = None
+
+    # ---------------------- server ----------------------
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        # release long-polling getUpdates
+        self.new_updates.set()
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}/bot"
+
+    @property
+    def base_file_url(self):
+        return f"http://{self.host}:{self.port}/file/bot"
+
+    async def _read_request(self, reader):
+        # (method, target, headers, body), None when the client is gone or idle too long
+        try:
+            line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+        except asyncio.TimeoutError:
+            return None
+        if not line.strip():
+            return None
+        parts = line.decode("latin-1").split(" ", 2)
+        if len(parts) != 3:
+            raise ValueError("bad request line")
+        headers = {}
+        while True:
+            h = await asyncio.wait_for(reader.readline(), READ_TIMEOUT)
+            if h in (b"\r\n", b"\n", b""):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise ValueError("too many headers")
+            k, _, v = h.decode("latin-1").partition(":")
+            headers[k.strip().lower()] = v.strip()
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise ValueError("chunked bodies are not supported")
+        length = int(headers.get("content-length") or 0)
+        if not 0 <= length <= MAX_BODY:
+            raise ValueError("bad content-length")
+        body = await asyncio.wait_for(reader.readexactly(length), READ_TIMEOUT) if length else b""
+        return parts[0], parts[1], headers, body
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    req = await self._read_request(reader)
+                except (ValueError, asyncio.LimitOverrunError):
+                    writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                    break
+                if req is None:
+                    break
+                method, target, headers, body = req
+
+                status, ctype, payload = await self._route(method, target, headers, body)
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: {ctype}\r\n"
+                    f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, http_method, target, headers, body):
+        path = target.split("?", 1)[0]
+        if http_method == "GET" and path.startswith("/file/bot"):
+            # /file/bot<token>/<file_path>
+            file_path = path.split("/", 3)[3] if path.count("/") >= 3 else ""
+            self.file_downloads += 1
+            for fp, data in self.files.values():
+                if fp == file_path:
+                    return "200 OK", "application/octet-stream", data
+            return "404 Not Found", "text/plain", b"not found"
+
+        if not path.startswith("/bot") or path.count("/") != 2:
+            return "404 Not Found", "text/plain", b"not found"
+        api_method = path.rsplit("/", 1)[1]
+        params, files = parse_body(headers.get("content-type", ""), body)
+        self.calls[api_method] = self.calls.get(api_method, 0) + 1
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if api_method in self.fault_methods:
+            r = self.rng.random()
+            if r < self.p429:
+                self.faults[(api_method, 429)] = self.faults.get((api_method, 429), 0) + 1
+                return self._error(429, f"Too Many Requests: retry after {self.retry_after}",
+                                   {"retry_after": self.retry_after})
+            if r < self.p429 + self.p400:
+                self.faults[(api_method, 400)] = self.faults.get((api_method, 400), 0) + 1
+                return self._error(400, "Bad Request: injected by fake_bot_api")
+
+        handler = getattr(self, "api_" + api_method, None)
+        result = await handler(params, files) if handler else True
+        if isinstance(result, tuple):
+            return self._error(*result)
+        if api_method in SEND_METHODS:
+            self.sent.append((time.monotonic(), api_method, params.get("chat_id"), params))
+            self.changed.set()
+        return "200 OK", "application/json", json.dumps({"ok": True, "result": result}).encode()
+
+    @staticmethod
+    def _error(code, description, parameters=None):
+        reply = {"ok": False, "error_code": code, "description": description}
+        if parameters:
+            reply["parameters"] = parameters
+        status = {400: "400 Bad Request", 429: "429 Too Many Requests"}.get(code, f"{code} Error")
+        return status, "application/json", json.dumps(reply).encode()
+
+    # ---------------------- Bot API methods ----------------------
+    async def api_getMe(self, params, files):
+        return {"id": 1, "is_bot": True, "first_name": "FakeBot", "username": "fake_bot",
+                "can_join_groups": True, "can_read_all_group_messages": False,
+                "supports_inline_queries": False}
+
+    async def api_getUpdates(self, params, files):
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = float(params.get("timeout") or 0)
+        if offset:
+            self.updates = [u for u in self.updates if u["update_id"] >= offset]
+        if not self.updates and timeout:
+            self.new_updates.clear()
+            try:
+                await asyncio.wait_for(self.new_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.updates[:limit]
+
+    async def api_sendMessage(self, params, files):
+        return self._message(params, text=params.get("text", ""))
+
+    async def api_editMessageText(self, params, files):
+        msg = self._message(params, text=params.get("text", ""), new=False)
+        msg["message_id"] = int(params.get("message_id") or 0)
+        msg["edit_date"] = int(time.time())
+        return msg
+
+    async def api_sendPoll(self, params, files):
+        options = json.loads(params.get("options") or "[]")
+        poll = {
+            "id": str(self.rng.getrandbits(63)),
+            "question": params.get("question", ""),
+            "options": [
+                {"text": o if isinstance(o, str) else o.get("text", ""), "voter_count": 0, "persistent_id": str(i)}
+                for i, o in enumerate(options)
+            ],
+            "total_voter_count": 0,
+            "is_closed": False,
+            "is_anonymous": params.get("is_anonymous", "true") != "false",
+            "type": params.get("type", "regular"),
+            "allows_multiple_answers": False,
+            "allows_revoting": False,
+            "members_only": False,
+        }
+        if params.get("correct_option_id") is not None:
+            poll["correct_option_id"] = int(params["correct_option_id"])
+        return self._message(params, poll=poll)
+
+    async def api_sendDocument(self, params, files):
+        doc = files.get("document")
+        if doc is None and not params.get("document"):
+            return 400, "Bad Request: there is no document in the request"
+        name, data = doc if doc else ("document", b"")
+        params["_document_name"] = name
+        params["_document_bytes"] = len(data)
+        params["_thumbnail_bytes"] = len(files["thumbnail"][1]) if "thumbnail" in files else 0
+        file_id, unique_id = self.add_file(data, "documents")
+        return self._message(params, document={"file_id": file_id, "file_unique_id": unique_id,
+                                               "file_name": name, "file_size": len(data)})
+
+    async def api_getFile(self, params, files):
+        file_id = params.get("file_id", "")
+        if file_id not in self.files:
+            return 400, "Bad Request: invalid file_id"
+        file_path, data = self.files[file_id]
+        return {"file_id": file_id, "file_unique_id": unique_id_of(file_id),
+                "file_size": len(data), "file_path": file_path}
+
+    def _message(self, params, new=True, **content):
+        chat_id = params.get("chat_id")
+        chat = chat_of(chat_id)
+        if new:
+            self.next_message_id[chat["id"]] = self.next_message_id.get(chat["id"], 0) + 1
+        msg = {"message_id": self.next_message_id.get(chat["id"], 1), "date": int(time.time()), "chat": chat}
+        if chat["type"] == "private":
+            msg["from"] = {"id": 1, "is_bot": True, "first_name": "FakeBot", "username": "fake_bot"}
+        msg.update(content)
+        return msg
+
+    # ---------------------- user side ----------------------
+    def add_file(self, data, folder="documents"):
+        """Register bytes the bot can getFile + download; returns (file_id, file_unique_id)."""
+        file_id = f"F{len(self.files) + 1:08d}"
+        ext = "jpg" if folder == "photos" else "bin"
+        self.files[file_id] = (f"{folder}/file_{len(self.files)}.{ext}", bytes(data))
+        return file_id, unique_id_of(file_id)
+
+    def push_update(self, **content):
+        update = {"update_id": self.next_update_id, **content}
+        self.next_update_id += 1
+        self.updates.append(update)
+        self.new_updates.set()
+        return update
+
+    def user_message(self, uid, **content):
+        self.next_message_id[uid] = self.next_message_id.get(uid, 0) + 1
+        msg = {
+            "message_id": self.next_message_id[uid],
+            "date": int(time.time()),
+            "chat": {"id": uid, "type": "private", "first_name": f"user{uid}"},
+            "from": {"id": uid, "is_bot": False, "first_name": f"user{uid}"},
+        }
+        msg.update(content)
+        return msg
+
+    def push_message(self, uid, text):
+        content = {"text": text}
+        if text.startswith("/"):
+            command = text.split()[0]
+            content["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+        return self.push_update(message=self.user_message(uid, **content))
+
+    def push_document(self, uid, data, file_name="file.pdf", mime_type="application/pdf"):
+        file_id, unique_id = self.add_file(data)
+        doc = {"file_id": file_id, "file_unique_id": unique_id, "file_name": file_name,
+               "mime_type": mime_type, "file_size": len(data)}
+        return self.push_update(message=self.user_message(uid, document=doc))
+
+    def push_photo(self, uid, sizes):
+        """sizes: [(width, height, bytes)] smallest first, like Telegram's PhotoSize list."""
+        photo = []
+        for w, h, data in sizes:
+            file_id, unique_id = self.add_file(data, "photos")
+            photo.append({"file_id": file_id, "file_unique_id": unique_id,
+                          "width": w, "height": h, "file_size": len(data)})
+        return self.push_update(message=self.user_message(uid, photo=photo))
+
+    def push_callback(self, uid, data):
+        message = self._message({"chat_id": uid}, text="…")
+        query = {"id": str(self.next_update_id), "from": {"id": uid, "is_bot": False, "first_name": f"user{uid}"},
+                 "chat_instance": str(uid), "data": data, "message": message}
+        return self.push_update(callback_query=query)
+
+    async def wait_until(self, predicate, timeout):
+        """Wait until predicate() holds, re-checked after every successful send."""
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return False
+            self.changed.clear()
+            try:
+                await asyncio.wait_for(self.changed.wait(), min(left, 0.5))
+            except asyncio.TimeoutError:
+                pass
+        return True
+
+    def count(self, method, chat_id=None):
+        return sum(1 for _, m, c, _ in self.sent if m == method and (chat_id is None or c == str(chat_id)))
+
+
+def unique_id_of(file_id):
+    return "U" + file_id[1:]
+
+
+def chat_of(chat_id):
+    chat_id = str(chat_id)
+    try:
+        n = int(chat_id)
+    except ValueError:
+        # @username: a stable fake channel id
+        return {"id": -1000000000000 - zlib.crc32(chat_id.encode()), "type": "channel", "title": chat_id,
+                "username": chat_id.lstrip("@")}
+    if n < 0:
+        return {"id": n, "type": "channel", "title": f"channel{n}"}
+    return {"id": n, "type": "private", "first_name": f"user{n}"}
+
+
+def parse_body(content_type, body):
+    """(params, files) from a form-urlencoded, JSON or multipart request; files: name -> (filename, bytes)."""
+    ctype = content_type.split(";", 1)[0].strip().lower()
+    if not body:
+        return {}, {}
+    if ctype == "application/json":
+        data = json.loads(body)
+        return {k: v if isinstance(v, str) else json.dumps(v) for k, v in data.items()}, {}
+    if ctype == "multipart/form-data":
+        boundary = content_type.split("boundary=", 1)[1].strip().strip('"').encode()
+        return parse_multipart(body, boundary)
+    return dict(parse_qsl(body.decode("utf-8"), keep_blank_values=True)), {}
+
+
+def parse_multipart(body, boundary):
+    params, files = {}, {}
+    for chunk in (b"\r\n" + body).split(b"\r\n--" + boundary)[1:]:
+        if chunk.startswith(b"--"):
+            break
+        head, _, content = chunk[2:].partition(b"\r\n\r\n")
+        disposition = {}
+        for line in head.decode("utf-8", "replace").split("\r\n"):
+            if line.lower().startswith("content-disposition:"):
+                for item in line.split(";")[1:]:
+                    k, _, v = item.strip().partition("=")
+                    disposition[k] = v.strip('"')
+        name = disposition.get("name")
+        if name is None:
+            continue
+        if "filename" in disposition:
+            files[name] = (disposition["filename"], content)
+        else:
+            params[name] = content.decode("utf-8")
+    # attach://<name> references (used for thumbnails)
+    for key, value in list(params.items()):
+        if value.startswith("attach://") and value[9:] in files:
+            files[key] = files.pop(value[9:])
+            del params[key]
+    return params, files
+
+
+async def _serve(args):
+    api = await FakeBotAPI(args.host, args.port, args.p429, args.retry_after, args.p400,
+                           args.latency_ms / 1000).start()
+    print(f"Fake Bot API on {api.base_url}<token>/<method>  (files: {api.base_file_url}<token>/<path>)")
+    try:
+        while True:
+            await asyncio.sleep(10)
+            print("calls:", dict(sorted(api.calls.items())), "faults:", api.faults)
+    finally:
+        await api.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Local fake Telegram Bot API server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8081)
+    ap.add_argument("--p429", type=float, default=0.0, help="share of sendPoll/sendDocument answered with 429")
+    ap.add_argument("--retry-after", type=int, default=1, help="retry_after seconds in injected 429s")
+    ap.add_argument("--p400", type=float, default=0.0, help="share of sendPoll/sendDocument answered with 400")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="added to every response")
+    args = ap.parse_args()
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()